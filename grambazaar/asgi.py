@@ -2,6 +2,9 @@
 ASGI config for grambazaar project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve the site through it (e.g. ``uvicorn grambazaar.asgi:application``) to
+enable the Server-Sent Events wallet stream (market.views.shg_wallet_events);
+under WSGI that endpoint declines and wallet pages fall back to polling.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
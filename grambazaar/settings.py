@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'market.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -80,6 +81,17 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Take the write lock when a transaction starts, so concurrent checkouts
+        # wait their turn instead of failing with "database is locked"
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # A file rather than shared-cache memory, so threaded tests get the
+        # same locking as the real database
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -135,6 +147,60 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are stored by content hash so identical images are kept once
+# (see market/storage.py).
+STORAGES = {
+    'default': {
+        'BACKEND': 'market.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Caching
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Catalog pages are cached with versioned keys (see market/caching.py). Use a
+# shared backend such as Redis or Memcached when running several processes.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'grambazaar',
+    }
+}
+
+CATALOG_CACHE_TIMEOUT = 60 * 15
+
+# Request instrumentation (see market/middleware.py)
+
+REQUEST_METRICS = {
+    'SAMPLE_RATE': 1.0,
+    'SLOW_MS': 500,
+    'BUFFER_SIZE': 100,
+}
+
+# Product image / SHG logo renditions (see market/renditions.py)
+
+IMAGE_RENDITION_WIDTHS = (320, 640, 1024)
+IMAGE_RENDITION_WORKERS = 2
+
+# Checkout stock holds (see market/inventory.py)
+
+INVENTORY_HOLD_SECONDS = 15 * 60
+
+# Wallet live updates: how long a cached ledger version may lag a write made
+# in another process (see market/ledger.py)
+
+WALLET_VERSION_TIMEOUT = 5
+
+# Background jobs run by `manage.py runworker` (see market/jobs.py)
+
+JOB_WORKER_PROCESSES = 2
+JOB_RETRY_BACKOFF_SECONDS = 30
+JOB_RETRY_MAX_BACKOFF_SECONDS = 60 * 60
+JOB_LEASE_SECONDS = 10 * 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,106 @@
+"""
+Caching for the public catalog pages (home, marketplace, product detail).
+
+Cache keys embed a version token instead of being deleted on change: the
+catalog version covers every listing page, and each product slug has its own
+version for its detail page. The signal handlers in ``market.signals`` bump
+the affected versions when a Product, ProductReview or SHG is saved or
+deleted, so stale entries are simply never read again and expire on their own.
+Versions are timestamps, so an evicted version key can never resurrect an
+older cached page.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.utils import translation
+
+CATALOG_TIMEOUT = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 15)
+
+_CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def _product_version_key(slug):
+    return f'catalog:product:{slug}:version'
+
+
+def _new_version():
+    return format(time.time_ns(), 'x')
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        version = _new_version()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def catalog_version():
+    return _get_version(_CATALOG_VERSION_KEY)
+
+
+def product_version(slug):
+    return _get_version(_product_version_key(slug))
+
+
+def bump_catalog():
+    cache.set(_CATALOG_VERSION_KEY, _new_version(), None)
+
+
+def bump_products(*slugs):
+    version = _new_version()
+    cache.set_many({_product_version_key(slug): version for slug in slugs if slug}, None)
+
+
+def make_key(scope, version, *parts):
+    """Build a cache key for ``scope`` from a version, the active language and ``parts``."""
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'catalog:{scope}:{translation.get_language()}:{version}:{digest}'
+
+
+def get_or_set(scope, version, parts, compute):
+    """Return the cached value for the key, computing and storing it on a miss."""
+    key = make_key(scope, version, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, CATALOG_TIMEOUT)
+    return value
+
+
+def cache_public_page(scope, version_for):
+    """
+    Cache whole responses for anonymous GET requests.
+
+    ``version_for(request, *args, **kwargs)`` returns the version token the
+    page depends on. Keys also include the active language (set by
+    LocaleMiddleware), the view arguments and the query string.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if (request.method != 'GET' or request.user.is_authenticated
+                    or len(messages.get_messages(request))):
+                return view_func(request, *args, **kwargs)
+
+            key = make_key(
+                f'page:{scope}', version_for(request, *args, **kwargs),
+                sorted(kwargs.items()), sorted(request.GET.lists()),
+            )
+            response = cache.get(key)
+            if response is not None:
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200 and not response.cookies:
+                if hasattr(response, 'render') and callable(response.render):
+                    response.render()
+                cache.set(key, response, CATALOG_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
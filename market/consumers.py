@@ -0,0 +1,109 @@
+"""
+Outbox consumers (see market.outbox).
+
+``ledger`` writes the SHG ledger notes for placed and cancelled orders;
+``notifications`` turns forecast alerts and product approvals/rejections into
+ForecastNotifications. Each handler receives a batch of events and writes its
+rows in bulk. Ledger dates come from the event, so a late or replayed batch
+records the day the order actually changed.
+
+Events for an SHG that has since been deleted are dropped: writing their rows
+would fail the foreign key, roll back the batch and leave the consumer stuck
+on it for good.
+
+The ledger is append-only, so ledger notes carry their event id and events
+that already have a note are skipped; replaying the ``ledger`` consumer
+(``process_outbox --replay-from``) only fills in notes that are missing.
+
+Ledger notes are appended when the consumer gets to them, so their place in
+an SHG's ledger ``sequence`` follows the consumer's lag rather than the time
+of the event. A settlement credit for a delivered order can therefore come
+before that order's "Pending" note.
+"""
+from django.utils import timezone
+
+from . import ledger
+from .models import SHG, ForecastNotification, LedgerEntry
+from .outbox import consumer
+
+
+def _live_shg_events(events):
+    """Drop events whose ``shg_id`` no longer exists; events without one pass through."""
+    shg_ids = {event.payload['shg_id'] for event in events if 'shg_id' in event.payload}
+    existing = set(SHG.objects.filter(pk__in=shg_ids).values_list('id', flat=True))
+    return [
+        event for event in events
+        if 'shg_id' not in event.payload or event.payload['shg_id'] in existing
+    ]
+
+
+def _event_date(event):
+    return timezone.localdate(event.created_at)
+
+
+def _placed_description(payload):
+    orders = payload['orders']
+    if len(orders) == 1:
+        order_id, title = orders[0]
+        return f"Order #{order_id} - {title} ({payload['method']}, Pending)"[:200]
+    ids = ', '.join(f"#{order_id}" for order_id, _title in orders)
+    return f"Checkout #{payload['checkout_id']} - Orders {ids} ({payload['method']}, Pending)"[:200]
+
+
+@consumer('ledger', topics=['order.placed', 'order.status_changed'])
+def ledger_notes(events):
+    events = [
+        event for event in events
+        if event.topic == 'order.placed' or event.payload['status'] == 'cancelled'
+    ]
+    events = _live_shg_events(events)
+    recorded = set(
+        LedgerEntry.objects.filter(event_id__in=[event.id for event in events]).values_list('event_id', flat=True)
+    )
+    entries = []
+    for event in events:
+        if event.id in recorded:
+            continue
+        payload = event.payload
+        if event.topic == 'order.placed':
+            description = _placed_description(payload)
+        else:
+            description = f"Order #{payload['order_id']} - {payload['title']} (Cancelled by {payload['reason']})"[:200]
+        entries.append(LedgerEntry(
+            shg_id=payload['shg_id'],
+            date=_event_date(event),
+            description=description,
+            event_id=event.id,
+        ))
+    ledger.record(entries)
+
+
+PRODUCT_STATUS_TITLES = {
+    'live': 'Product Approved',
+    'rejected': 'Product Rejected',
+}
+
+
+@consumer('notifications', topics=['forecast.alert', 'product.status_changed'])
+def notifications(events):
+    targets = []
+    notes = []
+    for event in _live_shg_events(events):
+        payload = event.payload
+        if event.topic == 'forecast.alert':
+            notes.append(ForecastNotification(title=payload['title'], message=payload['message']))
+        elif payload['status'] in PRODUCT_STATUS_TITLES:
+            notes.append(ForecastNotification(
+                title=PRODUCT_STATUS_TITLES[payload['status']],
+                message=f"\"{payload['title']}\" is now {payload['status']}.",
+            ))
+        else:
+            continue
+        targets.append(payload['shg_id'])
+    ForecastNotification.objects.bulk_create(notes)
+
+    Through = ForecastNotification.target_shgs.through
+    Through.objects.bulk_create([
+        Through(forecastnotification_id=note.pk, shg_id=shg_id)
+        for note, shg_id in zip(notes, targets)
+    ])
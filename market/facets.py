@@ -0,0 +1,134 @@
+"""
+Marketplace facet counts.
+
+``FacetCount`` holds the number of live products per facet value. Rows are
+adjusted incrementally by the signal handlers in ``market.signals`` whenever
+a product is saved/deleted or an SHG changes level or state, so rendering the
+marketplace filters is a single small query.
+"""
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import FacetCount, Product
+
+CATEGORY = 'category'
+VERIFICATION = 'verification_level'
+STATE = 'state'
+PRICE = 'price'
+
+STORED_FIELDS = ('status', 'category', 'price', 'shg__verification_level', 'shg__state')
+
+# (bucket key, lower bound inclusive, upper bound exclusive or None)
+PRICE_BUCKETS = [
+    ('0-250', Decimal('0'), Decimal('250')),
+    ('250-500', Decimal('250'), Decimal('500')),
+    ('500-1000', Decimal('500'), Decimal('1000')),
+    ('1000+', Decimal('1000'), None),
+]
+
+
+def price_bucket(price):
+    for key, low, high in PRICE_BUCKETS:
+        if price >= low and (high is None or price < high):
+            return key
+    return PRICE_BUCKETS[0][0]
+
+
+def price_bucket_range(key):
+    """Return (low, high) bounds for a bucket key, or None if the key is unknown."""
+    for bucket, low, high in PRICE_BUCKETS:
+        if bucket == key:
+            return low, high
+    return None
+
+
+def product_facets(status, category, price, verification_level, state):
+    """The facet values a product contributes to; only live products count."""
+    if status != 'live':
+        return []
+    return [
+        (CATEGORY, category),
+        (VERIFICATION, verification_level),
+        (STATE, state),
+        (PRICE, price_bucket(Decimal(price))),
+    ]
+
+
+def facets_for(product):
+    return product_facets(
+        product.status, product.category, product.price,
+        product.shg.verification_level, product.shg.state,
+    )
+
+
+def stored_facets(row):
+    """
+    Facet values of a stored product row, as returned by
+    ``Product.objects.values(*STORED_FIELDS)``.
+    """
+    if row is None:
+        return []
+    return product_facets(
+        row['status'], row['category'], row['price'],
+        row['shg__verification_level'], row['shg__state'],
+    )
+
+
+def apply_delta(old, new, weight=1):
+    """Move ``weight`` products from the ``old`` facet values to the ``new`` ones."""
+    delta = Counter()
+    for key in old:
+        delta[key] -= weight
+    for key in new:
+        delta[key] += weight
+    for (facet, value), change in delta.items():
+        if change:
+            _bump(facet, value, change)
+
+
+def _bump(facet, value, change):
+    updated = FacetCount.objects.filter(facet=facet, value=value).update(count=F('count') + change)
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            FacetCount.objects.create(facet=facet, value=value, count=change)
+    except IntegrityError:
+        # Another writer created the row first
+        FacetCount.objects.filter(facet=facet, value=value).update(count=F('count') + change)
+
+
+def facet_counts():
+    """Return ``{facet: {value: count}}`` for all non-empty facet values."""
+    counts = defaultdict(dict)
+    for facet, value, count in FacetCount.objects.filter(count__gt=0).values_list('facet', 'value', 'count'):
+        counts[facet][value] = count
+    return counts
+
+
+def rebuild():
+    """Recompute all facet counts from the live catalog with grouped queries."""
+    live = Product.objects.filter(status='live')
+    totals = Counter()
+    for row in live.values('category').annotate(n=Count('id')):
+        totals[(CATEGORY, row['category'])] += row['n']
+    for row in live.values('shg__verification_level').annotate(n=Count('id')):
+        totals[(VERIFICATION, row['shg__verification_level'])] += row['n']
+    for row in live.values('shg__state').annotate(n=Count('id')):
+        totals[(STATE, row['shg__state'])] += row['n']
+    for key, low, high in PRICE_BUCKETS:
+        bucket = live.filter(price__gte=low)
+        if high is not None:
+            bucket = bucket.filter(price__lt=high)
+        totals[(PRICE, key)] = bucket.count()
+
+    with transaction.atomic():
+        FacetCount.objects.all().delete()
+        FacetCount.objects.bulk_create([
+            FacetCount(facet=facet, value=value, count=count)
+            for (facet, value), count in totals.items() if count
+        ])
+    return totals
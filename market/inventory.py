@@ -0,0 +1,146 @@
+"""
+Stock reservations for checkout.
+
+Stock only ever moves through single conditional UPDATEs
+(``inventory = inventory - n WHERE inventory >= n``), so concurrent buyers
+cannot oversell. ``reserve`` takes stock out when the order form is
+submitted and records a ``Reservation`` that expires after
+``INVENTORY_HOLD_SECONDS``; payment ``commit``s the hold to its order, and
+``release_expired`` (run by the ``release_expired_holds`` command) puts
+abandoned holds back.
+
+These updates bypass ``Product.save()`` and its signals, so the product's
+cached detail page is bumped here.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest, Now
+from django.utils import timezone
+
+from . import caching
+from .models import Product, Reservation
+
+HOLD_SECONDS = getattr(settings, 'INVENTORY_HOLD_SECONDS', 15 * 60)
+
+
+def _bump_cached_products(product_ids):
+    slugs = list(Product.objects.filter(pk__in=product_ids).values_list('slug', flat=True))
+    transaction.on_commit(lambda: caching.bump_products(*slugs))
+
+
+def take(product_id, quantity=1):
+    """Atomically remove ``quantity`` from a live product's stock. Returns False if short."""
+    return not take_many({product_id: quantity})
+
+
+def take_many(quantities):
+    """
+    Take ``{product_id: quantity}`` out of stock, one conditional UPDATE per
+    product in id order. Returns the ids that were short; the other products
+    have already been decremented, so callers taking several products must
+    run this inside a transaction and roll back on a shortage.
+    """
+    short, taken = [], []
+    for product_id in sorted(quantities):
+        if Product.objects.filter(pk=product_id, status='live', inventory__gte=quantities[product_id]).update(
+            inventory=F('inventory') - quantities[product_id], updated_at=Now(),
+        ):
+            taken.append(product_id)
+        else:
+            short.append(product_id)
+    if taken:
+        _bump_cached_products(taken)
+    return short
+
+
+def restock(product_id, quantity=1):
+    """Atomically put ``quantity`` back into a product's stock."""
+    restock_many({product_id: quantity})
+
+
+def restock_many(quantities):
+    """Put ``{product_id: quantity}`` back into stock, one UPDATE per product."""
+    for product_id in sorted(quantities):
+        Product.objects.filter(pk=product_id).update(
+            inventory=F('inventory') + quantities[product_id], updated_at=Now(),
+        )
+    if quantities:
+        _bump_cached_products(list(quantities))
+
+
+def adjust(product_id, delta):
+    """Apply a manual stock correction as a delta, so concurrent decrements are kept; floors at zero."""
+    if delta > 0:
+        restock(product_id, delta)
+    elif delta < 0:
+        Product.objects.filter(pk=product_id).update(
+            inventory=Greatest(F('inventory') + delta, 0), updated_at=Now(),
+        )
+        _bump_cached_products([product_id])
+
+
+def reserve(product, user, quantity=1, hold_seconds=None):
+    """Hold stock for ``user``; returns the Reservation, or None when out of stock."""
+    hold_seconds = HOLD_SECONDS if hold_seconds is None else hold_seconds
+    with transaction.atomic():
+        if not take(product.pk, quantity):
+            return None
+        return Reservation.objects.create(
+            product=product, user=user, quantity=quantity,
+            expires_at=timezone.now() + timedelta(seconds=hold_seconds),
+        )
+
+
+def release(reservation_id, user=None):
+    """Give a held reservation's stock back. Returns True if it was still held."""
+    with transaction.atomic():
+        reservations = Reservation.objects.filter(pk=reservation_id, status='held')
+        if user is not None:
+            reservations = reservations.filter(user=user)
+        row = reservations.values_list('product_id', 'quantity').first()
+        if row is None or not reservations.update(status='released'):
+            return False
+        restock(*row)
+    return True
+
+
+def commit(reservation_id, user, order):
+    """
+    Attach a held reservation to ``order``. Returns False if the hold was
+    already released (expired and swept) or used; the caller should then
+    ``take`` stock afresh. A hold that has expired but not yet been swept
+    still owns its stock, so it can be committed safely.
+    """
+    return bool(
+        Reservation.objects.filter(pk=reservation_id, user=user, status='held')
+        .update(status='committed', order=order)
+    )
+
+
+def release_expired(batch_size=500, now=None):
+    """Release holds that expired before ``now``; returns the number released."""
+    now = now or timezone.now()
+    released = 0
+    while True:
+        with transaction.atomic():
+            expired = list(
+                Reservation.objects.select_for_update(skip_locked=True)
+                .filter(status='held', expires_at__lte=now)
+                .order_by('expires_at')
+                .values_list('id', 'product_id', 'quantity')[:batch_size]
+            )
+            if not expired:
+                return released
+            restocked = Counter()
+            for reservation_id, product_id, quantity in expired:
+                # Conditional per row: a concurrent commit may have won the hold
+                if Reservation.objects.filter(pk=reservation_id, status='held').update(status='released'):
+                    restocked[product_id] += quantity
+                    released += 1
+            restock_many(restocked)
+        if len(expired) < batch_size:
+            return released
@@ -0,0 +1,157 @@
+"""
+Database-backed background jobs.
+
+``enqueue`` inserts a ``Job`` row, inside the caller's transaction when there
+is one, so work is only queued for changes that commit. Functions registered
+with ``@task`` run in ``manage.py runworker`` processes, which claim ready
+jobs with ``SELECT ... FOR UPDATE SKIP LOCKED`` where the database supports
+it. On SQLite the claim is a single write transaction (``transaction_mode:
+IMMEDIATE`` serialises them), so two workers never take the same row.
+
+A failing job is retried with exponential backoff until ``max_attempts``;
+a job whose worker died is picked up again once its lease expires. Every run
+records how long the job waited after becoming due and how long it took.
+"""
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, Max, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+RETRY_BACKOFF = getattr(settings, 'JOB_RETRY_BACKOFF_SECONDS', 30)
+RETRY_MAX_BACKOFF = getattr(settings, 'JOB_RETRY_MAX_BACKOFF_SECONDS', 60 * 60)
+LEASE_SECONDS = getattr(settings, 'JOB_LEASE_SECONDS', 10 * 60)
+
+TASKS = {}
+
+
+def task(name, max_attempts=5):
+    """Register ``func(**payload)`` as the handler for jobs called ``name``."""
+    def register(func):
+        TASKS[name] = (func, max_attempts)
+        return func
+    return register
+
+
+def enqueue(name, run_at=None, **payload):
+    """Queue ``name`` to run with ``payload`` (JSON-serialisable) at ``run_at`` or now."""
+    _func, max_attempts = TASKS[name]
+    return Job.objects.create(
+        name=name, payload=payload, max_attempts=max_attempts, run_at=run_at or timezone.now(),
+    )
+
+
+def enqueue_once(name, **payload):
+    """Like ``enqueue``, unless a job with this name and payload is already waiting."""
+    if not Job.objects.filter(name=name, payload=payload, status='queued').exists():
+        enqueue(name, **payload)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def retry_delay(attempts):
+    """Seconds before retry number ``attempts``: doubling from RETRY_BACKOFF, capped, with jitter."""
+    delay = min(RETRY_BACKOFF * 2 ** (attempts - 1), RETRY_MAX_BACKOFF)
+    return delay * random.uniform(0.9, 1.1)
+
+
+def claim(worker, limit=1, now=None):
+    """Lock up to ``limit`` due jobs (or jobs with an expired lease) for ``worker``."""
+    now = now or timezone.now()
+    expired = now - timedelta(seconds=LEASE_SECONDS)
+    ready = Q(status='queued', run_at__lte=now) | Q(status='running', locked_at__lt=expired)
+    with transaction.atomic():
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(ready)
+            .order_by('run_at', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        Job.objects.filter(ready, pk__in=ids).update(
+            status='running', locked_by=worker, locked_at=now, attempts=F('attempts') + 1,
+        )
+        return list(Job.objects.filter(pk__in=ids, locked_by=worker, locked_at=now).order_by('run_at', 'id'))
+
+
+def run(job):
+    """Run a claimed job and record the outcome. Returns True on success."""
+    began = time.perf_counter()
+    error = None
+    try:
+        func, _max_attempts = TASKS[job.name]
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Job %s #%s failed (attempt %s/%s)', job.name, job.pk, job.attempts, job.max_attempts)
+
+    finished = timezone.now()
+    fields = {
+        'wait_ms': max(0, int((job.locked_at - job.run_at).total_seconds() * 1000)),
+        'duration_ms': int((time.perf_counter() - began) * 1000),
+        'locked_by': '',
+        'locked_at': None,
+    }
+    if error is None:
+        fields.update(status='done', finished_at=finished, last_error='')
+    elif job.attempts < job.max_attempts:
+        fields.update(status='queued', last_error=error,
+                      run_at=finished + timedelta(seconds=retry_delay(job.attempts)))
+    else:
+        fields.update(status='failed', finished_at=finished, last_error=error)
+    # A worker that overran its lease no longer owns the row; leave it to the new owner
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by, locked_at=job.locked_at).update(**fields)
+    logger.info('Job %s #%s %s in %d ms', job.name, job.pk, fields['status'], fields['duration_ms'])
+    return error is None
+
+
+def work(worker=None, batch_size=1, poll=2.0, burst=False, max_jobs=0):
+    """
+    Claim and run jobs until stopped. ``burst`` returns once nothing is due;
+    ``max_jobs`` returns after that many runs. Returns ``(succeeded, failed)``.
+    """
+    worker = worker or worker_name()
+    succeeded = failed = 0
+    while not max_jobs or succeeded + failed < max_jobs:
+        jobs = claim(worker, limit=batch_size)
+        if not jobs:
+            if burst:
+                break
+            time.sleep(poll)
+            continue
+        for job in jobs:
+            if run(job):
+                succeeded += 1
+            else:
+                failed += 1
+    return succeeded, failed
+
+
+def stats(since=None):
+    """Per task and status: job count, attempts and wait/run timings in milliseconds."""
+    jobs = Job.objects.all()
+    if since is not None:
+        jobs = jobs.filter(Q(finished_at__gte=since) | Q(status__in=['queued', 'running']))
+    return (
+        jobs.values('name', 'status')
+        .annotate(
+            jobs=Count('id'), most_attempts=Max('attempts'),
+            avg_wait=Avg('wait_ms'), max_wait=Max('wait_ms'),
+            avg_duration=Avg('duration_ms'), max_duration=Max('duration_ms'),
+        )
+        .order_by('name', 'status')
+    )
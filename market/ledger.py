@@ -0,0 +1,340 @@
+"""
+Writing and reading SHG ledgers: entries, monthly rollups, exports,
+statements and live updates.
+
+The ledger is append-only. Amounts are integer paise, and each SHG's
+entries carry a gapless ``sequence``, the running ``balance_paise`` and an
+``entry_hash`` over the entry and the previous entry's hash, so a changed,
+removed or reordered row breaks the chain (``manage.py verify_ledger``).
+``record`` is the only writer: it locks the SHGs involved, continues their
+chains from the last entry and relies on the unique (shg, sequence)
+constraint to reject a concurrent writer that got past the lock.
+
+New entries going through ``record`` are also folded into the per-month
+``LedgerMonth`` rollups (credits, debits, entry count and closing balance,
+also in paise). Everything here works in paise; only the values handed to
+exports and statements are converted to rupees with ``rupees``.
+Statements, opening balances and the wallet summary read those rollups, so
+they cost O(months) rather than O(entries); only a month cut by a date range
+is recounted from its entries. ``rebuild_rollups`` recomputes everything with
+one grouped query.
+
+An SHG's ledger version is the id of its newest entry. ``version`` serves it
+from the cache so wallet pollers and event streams that have nothing new to
+send do not touch the database; writers call ``bump_versions`` after
+inserting entries. Cached versions expire after WALLET_VERSION_TIMEOUT
+seconds, which bounds how stale they get when the writer runs in another
+process with a per-process cache.
+"""
+import hashlib
+from collections import defaultdict
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import SHG, LedgerEntry, LedgerMonth
+
+VERSION_TIMEOUT = getattr(settings, 'WALLET_VERSION_TIMEOUT', 5)
+
+EXPORT_FIELDS = ('date', 'description', 'credit_paise', 'debit_paise', 'balance_paise')
+
+GENESIS_HASH = '0' * 64
+
+
+def to_paise(amount):
+    """Rupees (Decimal, int or numeric string) to integer paise."""
+    return int((Decimal(amount) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def rupees(paise):
+    return Decimal(int(paise or 0)).scaleb(-2)
+
+
+def entries_between(shg, date_from=None, date_to=None):
+    """The SHG's entries dated within [date_from, date_to]; either end may be open."""
+    entries = LedgerEntry.objects.filter(shg=shg)
+    if date_from:
+        entries = entries.filter(date__gte=date_from)
+    if date_to:
+        entries = entries.filter(date__lte=date_to)
+    return entries
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def month_end(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+
+def _net(entries):
+    return entries.aggregate(net=Sum(F('credit_paise') - F('debit_paise')))['net'] or 0
+
+
+def opening_balance(shg, date_from=None):
+    """Net paise of credits and debits dated before ``date_from`` (zero for an open start)."""
+    if not date_from:
+        return 0
+    first = month_start(date_from)
+    before = (
+        LedgerMonth.objects.filter(shg=shg, month__lt=first)
+        .order_by('-month').values_list('closing_balance_paise', flat=True).first()
+    ) or 0
+    partial = _net(LedgerEntry.objects.filter(shg=shg, date__gte=first, date__lt=date_from)) if date_from > first else 0
+    return before + partial
+
+
+def export_rows(shg, date_from=None, date_to=None, running_total=False, chunk_size=2000):
+    """
+    Yield (date, description, credit, debit, balance after) in date order,
+    amounts in rupees, streamed from the database. With ``running_total``
+    each row also carries the net of the range so far, starting from the
+    opening balance of the range.
+    """
+    rows = (
+        entries_between(shg, date_from, date_to)
+        .order_by('date', 'id')
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+    balance = opening_balance(shg, date_from) if running_total else None
+    for day, description, credit, debit, balance_after in rows:
+        row = (day, description, rupees(credit), rupees(debit), rupees(balance_after))
+        if running_total:
+            balance += credit - debit
+            row += (rupees(balance),)
+        yield row
+
+
+def monthly_statement(shg, date_from=None, date_to=None):
+    """
+    One dict per month with entries in the range: ``month`` (first day),
+    ``opening``, ``credits``, ``debits``, ``closing`` (in rupees) and ``entries``.
+    """
+    months = LedgerMonth.objects.filter(shg=shg)
+    if date_from:
+        months = months.filter(month__gte=month_start(date_from))
+    if date_to:
+        months = months.filter(month__lte=date_to)
+    totals = {
+        month: (credits, debits, entries)
+        for month, credits, debits, entries in months.values_list('month', 'credits_paise', 'debits_paise', 'entries')
+    }
+
+    # Months the range only partly covers are recounted from their entries
+    for edge in {month_start(day) for day in (date_from, date_to) if day}:
+        if edge not in totals:
+            continue
+        start = max(edge, date_from) if date_from else edge
+        end = min(month_end(edge), date_to) if date_to else month_end(edge)
+        if (start, end) != (edge, month_end(edge)):
+            part = entries_between(shg, start, end).aggregate(
+                credits=Sum('credit_paise'), debits=Sum('debit_paise'), entries=Count('id'),
+            )
+            totals[edge] = (part['credits'] or 0, part['debits'] or 0, part['entries'])
+
+    balance = opening_balance(shg, date_from)
+    statement = []
+    for month in sorted(totals):
+        credits, debits, entries = totals[month]
+        if not entries:
+            continue
+        closing = balance + credits - debits
+        statement.append({
+            'month': month, 'opening': rupees(balance), 'credits': rupees(credits), 'debits': rupees(debits),
+            'closing': rupees(closing), 'entries': entries,
+        })
+        balance = closing
+    return statement
+
+
+def chain_hash(previous_hash, shg_id, sequence, day, description, credit_paise, debit_paise, balance_paise):
+    """SHA-256 hex digest linking one entry's contents to the previous entry's hash."""
+    payload = '|'.join(str(part) for part in (
+        previous_hash, shg_id, sequence, day.isoformat(), description, credit_paise, debit_paise, balance_paise,
+    ))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def chain_heads(shg_ids):
+    """``{shg_id: (sequence, balance_paise, entry_hash)}`` of each SHG's last entry."""
+    heads = {}
+    for shg_id in shg_ids:
+        last = (
+            LedgerEntry.objects.filter(shg_id=shg_id).order_by('-sequence')
+            .values_list('sequence', 'balance_paise', 'entry_hash').first()
+        )
+        if last:
+            heads[shg_id] = last
+    return heads
+
+
+def link(entries, heads):
+    """
+    Fill in ``sequence``, ``balance_paise`` and ``entry_hash`` of unsaved
+    ``entries`` in list order, continuing the chains in ``heads`` (as from
+    ``chain_heads``; updated in place).
+    """
+    for entry in entries:
+        sequence, balance, previous_hash = heads.get(entry.shg_id, (0, 0, GENESIS_HASH))
+        entry.sequence = sequence + 1
+        entry.balance_paise = balance + entry.credit_paise - entry.debit_paise
+        entry.entry_hash = chain_hash(
+            previous_hash, entry.shg_id, entry.sequence, entry.date, entry.description,
+            entry.credit_paise, entry.debit_paise, entry.balance_paise,
+        )
+        heads[entry.shg_id] = (entry.sequence, entry.balance_paise, entry.entry_hash)
+    return entries
+
+
+def record(entries):
+    """
+    Append ``entries`` (unsaved LedgerEntry objects with shg, date,
+    description and paise amounts) to their SHGs' chains with one
+    ``bulk_create``, fold them into the monthly rollups and publish the new
+    ledger versions. Returns the saved entries.
+    """
+    shg_ids = sorted({entry.shg_id for entry in entries})
+    with transaction.atomic():
+        # Writers for the same SHG queue here rather than forking its chain
+        list(SHG.objects.select_for_update().filter(pk__in=shg_ids).values_list('id', flat=True))
+        entries = LedgerEntry.objects.bulk_create(link(entries, chain_heads(shg_ids)))
+        _add_to_rollups(entries)
+    bump_versions(entries)
+    return entries
+
+
+def verify(shg_ids=None, chunk_size=5000):
+    """
+    Check the chains in one streamed pass over the entries in (shg, sequence)
+    order. Yields ``(shg_id, entries, balance_paise, problems)`` per SHG, where
+    ``problems`` lists ``(sequence, message)`` for every gap, balance that
+    does not follow from the previous one, or hash that does not match. Each
+    check resumes from the stored row, so one bad row is reported once.
+    """
+    rows = LedgerEntry.objects.order_by('shg_id', 'sequence')
+    if shg_ids:
+        rows = rows.filter(shg_id__in=shg_ids)
+    rows = rows.values_list(
+        'shg_id', 'sequence', 'date', 'description', 'credit_paise', 'debit_paise', 'balance_paise', 'entry_hash',
+    ).iterator(chunk_size=chunk_size)
+
+    current = None
+    for shg_id, sequence, day, description, credit, debit, balance, entry_hash in rows:
+        if shg_id != current:
+            if current is not None:
+                yield current, count, previous_balance, problems
+            current, count, problems = shg_id, 0, []
+            previous_sequence, previous_balance, previous_hash = 0, 0, GENESIS_HASH
+        count += 1
+        if sequence != previous_sequence + 1:
+            problems.append((sequence, f'expected sequence {previous_sequence + 1}'))
+        if balance != previous_balance + credit - debit:
+            problems.append((sequence, f'balance {balance} does not follow {previous_balance} + {credit} - {debit}'))
+        if entry_hash != chain_hash(previous_hash, shg_id, sequence, day, description, credit, debit, balance):
+            problems.append((sequence, 'hash mismatch'))
+        previous_sequence, previous_balance, previous_hash = sequence, balance, entry_hash
+    if current is not None:
+        yield current, count, previous_balance, problems
+
+
+def _add_to_rollups(entries):
+    changes = defaultdict(lambda: [0, 0, 0])
+    for entry in entries:
+        change = changes[(entry.shg_id, month_start(entry.date))]
+        change[0] += entry.credit_paise
+        change[1] += entry.debit_paise
+        change[2] += 1
+
+    for (shg_id, month), (credits, debits, count) in sorted(changes.items()):
+        net = credits - debits
+        # A back-dated entry moves the closing balance of every later month
+        if net:
+            LedgerMonth.objects.filter(shg_id=shg_id, month__gt=month).update(
+                closing_balance_paise=F('closing_balance_paise') + net
+            )
+        if _update_month(shg_id, month, credits, debits, count):
+            continue
+        previous = (
+            LedgerMonth.objects.filter(shg_id=shg_id, month__lt=month)
+            .order_by('-month').values_list('closing_balance_paise', flat=True).first()
+        ) or 0
+        try:
+            with transaction.atomic():
+                LedgerMonth.objects.create(
+                    shg_id=shg_id, month=month, credits_paise=credits, debits_paise=debits, entries=count,
+                    closing_balance_paise=previous + net,
+                )
+        except IntegrityError:
+            # Created concurrently since the update above
+            _update_month(shg_id, month, credits, debits, count)
+
+
+def _update_month(shg_id, month, credits, debits, count):
+    return LedgerMonth.objects.filter(shg_id=shg_id, month=month).update(
+        credits_paise=F('credits_paise') + credits,
+        debits_paise=F('debits_paise') + debits,
+        entries=F('entries') + count,
+        closing_balance_paise=F('closing_balance_paise') + (credits - debits),
+    )
+
+
+def rebuild_rollups():
+    """Recompute every LedgerMonth from the entries with one grouped query. Returns the row count."""
+    months = (
+        LedgerEntry.objects.annotate(month=TruncMonth('date'))
+        .values('shg_id', 'month')
+        .annotate(credits=Sum('credit_paise'), debits=Sum('debit_paise'), entries=Count('id'))
+        .order_by('shg_id', 'month')
+    )
+    rows = []
+    balance, current_shg = 0, None
+    for row in months.iterator():
+        if row['shg_id'] != current_shg:
+            balance, current_shg = 0, row['shg_id']
+        credits, debits = row['credits'] or 0, row['debits'] or 0
+        balance += credits - debits
+        rows.append(LedgerMonth(
+            shg_id=row['shg_id'], month=row['month'], credits_paise=credits, debits_paise=debits,
+            entries=row['entries'], closing_balance_paise=balance,
+        ))
+    with transaction.atomic():
+        LedgerMonth.objects.all().delete()
+        LedgerMonth.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def latest_id(shg_id):
+    """Id of the SHG's newest ledger entry (0 if none), read from the database."""
+    return LedgerEntry.objects.filter(shg_id=shg_id).order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def _version_key(shg_id):
+    return f'ledger:version:{shg_id}'
+
+
+def version(shg_id):
+    """``latest_id`` through the cache."""
+    key = _version_key(shg_id)
+    value = cache.get(key)
+    if value is None:
+        value = latest_id(shg_id)
+        cache.set(key, value, VERSION_TIMEOUT)
+    return value
+
+
+def bump_versions(entries):
+    """Publish the new versions of the SHGs of freshly inserted ``entries`` once they commit."""
+    latest = {}
+    for entry in entries:
+        latest[entry.shg_id] = max(latest.get(entry.shg_id, 0), entry.pk)
+    if latest:
+        transaction.on_commit(lambda: cache.set_many(
+            {_version_key(shg_id): entry_id for shg_id, entry_id in latest.items()}, VERSION_TIMEOUT,
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from market import renditions
+from market.models import SHG, ImageRendition, Product
+
+
+class Command(BaseCommand):
+    help = 'Generate resized and WebP renditions for existing product images and SHG logos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=renditions.WORKERS,
+                            help='Number of worker processes.')
+        parser.add_argument('--force', action='store_true',
+                            help='Re-render images that already have renditions.')
+
+    def handle(self, *args, **options):
+        sources = set(Product.objects.exclude(image='').values_list('image', flat=True))
+        sources |= set(SHG.objects.exclude(logo='').exclude(logo__isnull=True).values_list('logo', flat=True))
+        if not options['force']:
+            sources -= set(ImageRendition.objects.values_list('source', flat=True).distinct())
+
+        if not sources:
+            self.stdout.write('All images already have renditions.')
+            return
+
+        self.stdout.write(f'Rendering {len(sources)} images with {options["workers"]} workers...')
+        failed = 0
+        for source, error in renditions.generate_many(sorted(sources), workers=options['workers']):
+            if error is not None:
+                failed += 1
+                self.stderr.write(f'{source}: {error}')
+        self.stdout.write(self.style.SUCCESS(f'Rendered {len(sources) - failed} images, {failed} failed.'))
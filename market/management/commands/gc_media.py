@@ -0,0 +1,80 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from market.models import SHG, ImageRendition, MediaBlob, Product
+from market.storage import delete_file
+
+UPLOAD_DIRS = ('product_images', 'shg_logos')
+
+
+class Command(BaseCommand):
+    help = (
+        'Recount media references and delete uploaded files (and their renditions) '
+        'that no Product or SHG points to any more.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='List orphans without deleting them.')
+        parser.add_argument('--min-age', type=int, default=3600,
+                            help='Skip files modified less than this many seconds ago (uploads in flight).')
+
+    def handle(self, *args, **options):
+        references = self._count_references()
+        if not options['dry_run']:
+            with transaction.atomic():
+                MediaBlob.objects.all().delete()
+                MediaBlob.objects.bulk_create(
+                    [MediaBlob(name=name, ref_count=count) for name, count in references.items()],
+                    batch_size=1000,
+                )
+
+        cutoff = time.time() - options['min_age']
+        orphans = [
+            name for name, mtime in self._stored_files()
+            if name not in references and mtime < cutoff
+        ]
+        stale_sources = set(
+            ImageRendition.objects.exclude(source__in=references.keys())
+            .values_list('source', flat=True).distinct()
+        )
+
+        for name in orphans:
+            self.stdout.write(f'orphan: {name}')
+            if not options['dry_run']:
+                delete_file(name)
+        for source in stale_sources - set(orphans):
+            self.stdout.write(f'orphan renditions: {source}')
+            if not options['dry_run']:
+                delete_file(source)
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {len(orphans)} orphaned files; {len(references)} files are referenced.'
+        ))
+
+    def _count_references(self):
+        references = {}
+        for name, count in (
+            Product.objects.exclude(image='').values_list('image').annotate(n=Count('id')).order_by()
+        ):
+            references[name] = references.get(name, 0) + count
+        for name, count in (
+            SHG.objects.exclude(logo='').exclude(logo__isnull=True)
+            .values_list('logo').annotate(n=Count('id')).order_by()
+        ):
+            references[name] = references.get(name, 0) + count
+        return references
+
+    def _stored_files(self):
+        media_root = str(settings.MEDIA_ROOT)
+        for upload_dir in UPLOAD_DIRS:
+            for dirpath, _dirnames, filenames in os.walk(os.path.join(media_root, upload_dir)):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    name = os.path.relpath(path, media_root).replace(os.sep, '/')
+                    yield name, os.path.getmtime(path)
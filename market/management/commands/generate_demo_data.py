@@ -0,0 +1,309 @@
+"""
+Generate a large, reproducible synthetic dataset for benchmarking.
+
+Everything is inserted with ``bulk_create`` in batches and driven by a single
+seeded ``random.Random``, so the same options always produce the same rows.
+Signals do not fire for bulk inserts, so the derived tables (search index,
+facet counts, rating aggregates) are rebuilt at the end.
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from market import caching, facets, ledger, ratings, search
+from market.models import (
+    SHG, BuyerProfile, ForecastNotification, LedgerEntry, Order, Product, ProductReview,
+)
+
+# state -> city -> neighbourhoods; weights below make the first areas busiest
+LOCATIONS = {
+    'Rajasthan': {'Jaipur': ['Malviya Nagar', 'Vaishali Nagar', 'Mansarovar', 'C-Scheme', 'Sanganer'],
+                  'Udaipur': ['Hiran Magri', 'Fatehpura', 'Sector 14']},
+    'Uttar Pradesh': {'Varanasi': ['Lanka', 'Sigra', 'Bhelupur', 'Assi'],
+                      'Lucknow': ['Gomti Nagar', 'Aliganj', 'Indira Nagar', 'Hazratganj']},
+    'Kerala': {'Kochi': ['Kakkanad', 'Edappally', 'Fort Kochi', 'Vyttila'],
+               'Thrissur': ['Poothole', 'Ayyanthole']},
+    'Madhya Pradesh': {'Bhopal': ['Arera Colony', 'MP Nagar', 'Kolar Road'],
+                       'Indore': ['Vijay Nagar', 'Palasia', 'Rajwada']},
+    'Maharashtra': {'Pune': ['Kothrud', 'Hadapsar', 'Baner', 'Aundh', 'Wakad'],
+                    'Nagpur': ['Dharampeth', 'Sitabuldi', 'Manish Nagar']},
+    'West Bengal': {'Kolkata': ['Salt Lake', 'Ballygunge', 'Howrah', 'Dum Dum']},
+    'Odisha': {'Bhubaneswar': ['Saheed Nagar', 'Patia', 'Nayapalli']},
+}
+
+PRODUCT_NAMES = {
+    'handicrafts': ['Jute Bag', 'Bamboo Basket', 'Wooden Toy', 'Macrame Hanger', 'Cane Tray'],
+    'food': ['Mango Pickle', 'Millet Laddu', 'Spice Mix', 'Jaggery Block', 'Papad Pack'],
+    'textiles': ['Cotton Saree', 'Block Print Dupatta', 'Handloom Stole', 'Khadi Kurta'],
+    'pottery': ['Terracotta Cups', 'Clay Diyas', 'Water Pot', 'Planter Set'],
+    'jewelry': ['Beaded Necklace', 'Thread Bangles', 'Oxidised Earrings'],
+    'other': ['Herbal Soap', 'Incense Sticks', 'Leaf Plates'],
+}
+ADJECTIVES = ['Handmade', 'Organic', 'Traditional', 'Eco-friendly', 'Festive', 'Premium', 'Village']
+FIRST_NAMES = ['Asha', 'Meena', 'Ravi', 'Sunita', 'Arjun', 'Kavita', 'Vikram', 'Lakshmi', 'Imran', 'Priya']
+LAST_NAMES = ['Sharma', 'Verma', 'Nair', 'Patil', 'Das', 'Khan', 'Reddy', 'Singh', 'Yadav', 'Iyer']
+STOCK_IMAGES = [
+    'product_images/jute.png', 'product_images/bamboo_basket.jfif', 'product_images/saree.jfif',
+    'product_images/tea_cups.jfif', 'product_images/neckless.jfif', 'product_images/spice_mix.jfif',
+]
+
+ORDER_STATUS_WEIGHTS = [
+    ('delivered', 55), ('shipped', 10), ('approved', 10),
+    ('pending_admin_approval', 15), ('cancelled', 10),
+]
+PRODUCT_STATUS_WEIGHTS = [('live', 85), ('pending', 8), ('rejected', 4), ('draft', 3)]
+
+
+@contextmanager
+def preserve_timestamps(*models):
+    """Let bulk_create keep the generated created_at/updated_at values."""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Generate a reproducible synthetic dataset (SHGs, products, orders, ledger, reviews, notifications).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shgs', type=int, default=100)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--buyers', type=int, default=1000)
+        parser.add_argument('--orders', type=int, default=20000)
+        parser.add_argument('--reviews', type=int, default=5000)
+        parser.add_argument('--notifications', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='gen', help='Prefix for generated usernames.')
+        parser.add_argument('--start', default='2025-01-01', help='First order date (YYYY-MM-DD).')
+        parser.add_argument('--days', type=int, default=365, help='Days of order history.')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+        if options['orders'] and not options['buyers']:
+            raise CommandError('Orders need at least one buyer (--buyers).')
+        if User.objects.filter(username__startswith=f"{self.prefix}_").exists():
+            raise CommandError(f'Users with prefix "{self.prefix}_" already exist; pick another --prefix.')
+
+        start = timezone.make_aware(datetime.strptime(options['start'], '%Y-%m-%d'))
+        self.start, self.span = start, timedelta(days=options['days'])
+        self.password = make_password('password123')
+        self.area_weights = {}
+
+        began = time.monotonic()
+        with preserve_timestamps(SHG, Product, Order, LedgerEntry, ProductReview, ForecastNotification, BuyerProfile):
+            shgs = self._step('SHGs', self.create_shgs, options['shgs'])
+            products = self._step('products', self.create_products, shgs, options['products'])
+            buyers = self._step('buyers', self.create_buyers, options['buyers'])
+            self._step('orders and ledger entries', self.create_orders, shgs, products, buyers, options['orders'])
+            self._step('reviews', self.create_reviews, products, buyers, options['reviews'])
+            self._step('notifications', self.create_notifications, shgs, options['notifications'])
+
+        self._step('search index', lambda: search.rebuild_index())
+        self._step('facet counts', lambda: facets.rebuild())
+        self._step('rating aggregates', lambda: ratings.recompute(batch_size=self.batch_size))
+        self._step('ledger rollups', lambda: ledger.rebuild_rollups())
+        caching.bump_catalog()
+        self.stdout.write(self.style.SUCCESS(f'Done in {time.monotonic() - began:.1f}s.'))
+
+    def _step(self, label, func, *args):
+        began = time.monotonic()
+        result = func(*args)
+        self.stdout.write(f'  {label}: {time.monotonic() - began:.1f}s')
+        return result
+
+    def _batches(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _weighted(self, choices):
+        values, weights = zip(*choices)
+        return self.rng.choices(values, weights=weights)[0]
+
+    def _skewed(self, items, power=2.5):
+        """Pick from ``items`` with a long tail: early entries are much more popular."""
+        return items[int(len(items) * self.rng.random() ** power)]
+
+    def _date(self, fraction):
+        return self.start + self.span * fraction
+
+    def _create_users(self, kind, count):
+        users = (
+            User(username=f'{self.prefix}_{kind}{i}', email=f'{self.prefix}_{kind}{i}@demo.example',
+                 password=self.password, first_name=self.rng.choice(FIRST_NAMES),
+                 last_name=self.rng.choice(LAST_NAMES))
+            for i in range(count)
+        )
+        for batch in self._batches(users):
+            User.objects.bulk_create(batch)
+        return list(
+            User.objects.filter(username__startswith=f'{self.prefix}_{kind}').order_by('id')
+        )
+
+    def create_shgs(self, count):
+        users = self._create_users('shg', count)
+        cities = [(state, city) for state, city_map in LOCATIONS.items() for city in city_map]
+        rows = []
+        for i, user in enumerate(users):
+            state, city = self.rng.choice(cities)
+            created = self._date(0) - timedelta(days=self.rng.randint(30, 400))
+            rows.append(SHG(
+                user=user, name=f'{city} Mahila SHG {i + 1}', contact_person=user.get_full_name(),
+                phone=f'9{self.rng.randint(100000000, 999999999)}', email=user.email,
+                state=state, city=city, description='Synthetic SHG for benchmarking.',
+                verification_level=self._weighted([('bronze', 60), ('silver', 30), ('gold', 10)]),
+                created_at=created, updated_at=created,
+            ))
+        for batch in self._batches(rows):
+            SHG.objects.bulk_create(batch)
+        return list(SHG.objects.filter(user__in=users).order_by('id'))
+
+    def create_products(self, shgs, count):
+        def rows():
+            for i in range(count):
+                category = self.rng.choice(list(PRODUCT_NAMES))
+                title = f'{self.rng.choice(ADJECTIVES)} {self.rng.choice(PRODUCT_NAMES[category])}'
+                created = self._date(self.rng.random() * 0.5) - timedelta(days=30)
+                yield Product(
+                    shg=self._skewed(shgs, power=1.5),
+                    title=title, slug=f'{self.prefix}-{i}-{title.lower().replace(" ", "-")}',
+                    description=f'{title} made by rural artisans. Lot {i}.',
+                    price=Decimal(self.rng.choice([99, 149, 199, 249, 299, 399, 499, 699, 999, 1499, 2499])),
+                    category=category, image=self.rng.choice(STOCK_IMAGES),
+                    inventory=self.rng.randint(0, 200),
+                    status=self._weighted(PRODUCT_STATUS_WEIGHTS),
+                    created_at=created, updated_at=created,
+                )
+        for batch in self._batches(rows()):
+            Product.objects.bulk_create(batch)
+        return list(
+            Product.objects.filter(slug__startswith=f'{self.prefix}-')
+            .order_by('id').values_list('id', 'shg_id', 'price', 'title', 'status')
+        )
+
+    def create_buyers(self, count):
+        users = self._create_users('buyer', count)
+        rows = []
+        for user in users:
+            state, city, area = self._address_parts()
+            rows.append(BuyerProfile(
+                user=user, phone=f'8{self.rng.randint(100000000, 999999999)}',
+                address=f'{self.rng.randint(1, 400)}, {area}, {city}', city=city, state=state,
+                pincode=str(self.rng.randint(110001, 855999)),
+                created_at=self.start, updated_at=self.start,
+            ))
+        for batch in self._batches(rows):
+            BuyerProfile.objects.bulk_create(batch)
+        return users
+
+    def _address_parts(self):
+        state = self.rng.choice(list(LOCATIONS))
+        city = self.rng.choice(list(LOCATIONS[state]))
+        areas = LOCATIONS[state][city]
+        weights = self.area_weights.setdefault(city, [1 / (rank + 1) for rank in range(len(areas))])
+        return state, city, self.rng.choices(areas, weights=weights)[0]
+
+    def create_orders(self, shgs, products, buyers, count):
+        live = [p for p in products if p[4] == 'live'] or products
+        balances = {shg.id: 0 for shg in shgs}
+        heads = {}
+        step = 1 / max(count, 1)
+
+        for batch_start in range(0, count, self.batch_size):
+            orders, meta = [], []
+            for i in range(batch_start, min(batch_start + self.batch_size, count)):
+                product_id, shg_id, price, title, _status = self._skewed(live)
+                # Monotonic timestamps keep the ledger's running balance chronological
+                created = self._date((i + self.rng.random()) * step)
+                status = self._weighted(ORDER_STATUS_WEIGHTS)
+                _state, city, area = self._address_parts()
+                buyer = self._skewed(buyers, power=1.5)
+                orders.append(Order(
+                    product_id=product_id, amount=price, status=status,
+                    buyer=buyer, buyer_name=buyer.get_full_name(),
+                    buyer_contact=f'7{self.rng.randint(100000000, 999999999)}',
+                    # "<house>, <area>, <city>" so the forecast's area extraction sees the area
+                    address=f'{self.rng.randint(1, 400)}, {area}, {city}', area=area,
+                    created_at=created, updated_at=created,
+                    settled_at=created if status == 'delivered' else None,
+                ))
+                meta.append((shg_id, price, title, status, created))
+
+            with transaction.atomic():
+                Order.objects.bulk_create(orders)
+                entries = []
+                for order, (shg_id, price, title, status, created) in zip(orders, meta):
+                    entries.append(LedgerEntry(
+                        shg_id=shg_id, date=created.date(),
+                        description=f'Order #{order.id} - {title} (Pending)', created_at=created,
+                    ))
+                    if status == 'delivered':
+                        balances[shg_id] += ledger.to_paise(price)
+                        entries.append(LedgerEntry(
+                            shg_id=shg_id, date=created.date(), credit_paise=ledger.to_paise(price),
+                            description=f'Order #{order.id} payout', created_at=created,
+                        ))
+                # Chains continue across batches through ``heads``
+                LedgerEntry.objects.bulk_create(ledger.link(entries, heads))
+
+        for shg in shgs:
+            shg.wallet_balance_paise = balances[shg.id]
+        SHG.objects.bulk_update(shgs, ['wallet_balance_paise'], batch_size=self.batch_size)
+
+    def create_reviews(self, products, buyers, count):
+        live = [p for p in products if p[4] == 'live'] or products
+        rows = (
+            ProductReview(
+                product_id=self._skewed(live)[0],
+                user=self.rng.choice(buyers),
+                rating=self._weighted([(5, 45), (4, 30), (3, 12), (2, 6), (1, 7)]),
+                comment=self.rng.choice(['', '', 'Lovely quality.', 'Arrived late.', 'Worth the price.']),
+                created_at=self._date(self.rng.random()),
+            )
+            for _ in range(count)
+        )
+        for batch in self._batches(rows):
+            ProductReview.objects.bulk_create(batch)
+
+    def create_notifications(self, shgs, count):
+        notifications = [
+            ForecastNotification(
+                title=self.rng.choice(['Low Inventory Alert', 'Seasonal Demand Insight']),
+                message=f'Synthetic forecast notification {i}.',
+                created_at=self._date(self.rng.random()),
+            )
+            for i in range(count)
+        ]
+        ForecastNotification.objects.bulk_create(notifications, batch_size=self.batch_size)
+        Target = ForecastNotification.target_shgs.through
+        targets = (
+            Target(forecastnotification_id=notification.id, shg_id=shg.id)
+            for notification in notifications
+            for shg in self.rng.sample(shgs, min(len(shgs), self.rng.randint(1, 3)))
+        )
+        for batch in self._batches(targets):
+            Target.objects.bulk_create(batch)
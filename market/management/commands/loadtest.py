@@ -0,0 +1,248 @@
+"""
+In-process load test against the real URLconf.
+
+Worker threads each hold Django test clients (anonymous, a logged-in buyer
+and a logged-in SHG) and pick scenarios from a weighted traffic mix until
+the time or request budget runs out:
+
+    browse     home page and marketplace listings with random filters/pages
+    detail     product detail pages, skewed towards popular products
+    login      buyer login form POST (includes password hashing)
+    checkout   buyer_order form -> fake_payment POST
+    dashboard  SHG dashboard load followed by wallet API delta polling
+
+Every request is timed and reported per view (count, errors, throughput,
+p50/p95/p99/max). Users come from ``generate_demo_data``; pass ``--generate``
+to create a dataset of the given size first. Requests go through the full
+middleware stack but not a network socket, so results measure application
+and database time.
+
+Checkouts and logins write orders, reservations and sessions to the
+configured database, so the command refuses to run without
+``--allow-writes``.
+"""
+import math
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+
+from market import facets
+from market.models import Product
+
+DEFAULT_MIX = 'browse=35,detail=30,login=5,checkout=10,dashboard=20'
+BUYER_PASSWORD = 'password123'
+
+_KEY_RE = re.compile(rb'name="idempotency_key" value="([\w-]+)"')
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    # round() first so float noise such as 0.07 * 100 = 7.000000000000001 does not bump the rank
+    rank = math.ceil(round(fraction * len(sorted_values), 9))
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+class Worker:
+    def __init__(self, command, rng):
+        self.command = command
+        self.rng = rng
+        self.anonymous = Client()
+        self.buyer = rng.choice(command.buyers)
+        self.buyer_client = Client()
+        self.buyer_client.force_login(self.buyer)
+        self.shg_client = None
+        if command.shg_users:
+            self.shg_client = Client()
+            self.shg_client.force_login(rng.choice(command.shg_users))
+
+    def timed(self, label, func, path, *args, **kwargs):
+        began = time.perf_counter()
+        try:
+            response = func(path, *args, **kwargs)
+        except Exception:
+            self.command.record(label, time.perf_counter() - began, 599)
+            return None
+        elapsed = time.perf_counter() - began
+        match = getattr(response, 'resolver_match', None)
+        self.command.record(match.url_name if match else label, elapsed, response.status_code)
+        return response
+
+    def product_slug(self):
+        slugs = self.command.slugs
+        return slugs[int(len(slugs) * self.rng.random() ** 2)]
+
+    def browse(self):
+        if self.rng.random() < 0.3:
+            self.timed('home', self.anonymous.get, '/')
+            return
+        params = {}
+        if self.rng.random() < 0.4:
+            params['category'] = self.rng.choice(self.command.categories)
+        if self.rng.random() < 0.2:
+            params['sort'] = 'rating'
+        if self.rng.random() < 0.15:
+            params['q'] = self.rng.choice(['saree', 'bag', 'pickle', 'clay', 'bamboo'])
+        self.timed('marketplace', self.anonymous.get, '/marketplace/', params)
+
+    def detail(self):
+        self.timed('product_detail', self.anonymous.get, f'/product/{self.product_slug()}/')
+
+    def login(self):
+        client = Client()
+        buyer = self.rng.choice(self.command.buyers)
+        self.timed('buyer_login', client.post, '/buyer/login/',
+                   {'username': buyer.username, 'password': BUYER_PASSWORD})
+
+    def checkout(self):
+        slug = self.product_slug()
+        client = self.buyer_client
+        self.timed('buyer_order', client.get, f'/product/{slug}/order/')
+        response = self.timed('buyer_order', client.post, f'/product/{slug}/order/', {
+            'buyer_name': self.buyer.get_full_name() or self.buyer.username,
+            'buyer_contact': '9000000000',
+            'address': '12, Malviya Nagar, Jaipur',
+        })
+        if response is None or not response.get('Location', '').endswith('/payment/'):
+            return
+        page = self.timed('fake_payment', client.get, f'/product/{slug}/payment/')
+        found = _KEY_RE.search(page.content) if page is not None and page.status_code == 200 else None
+        self.timed('fake_payment', client.post, f'/product/{slug}/payment/', {
+            'payment_method': self.rng.choice(['card', 'upi', 'cod']),
+            'idempotency_key': found.group(1).decode() if found else '',
+        })
+
+    def dashboard(self):
+        if self.shg_client is None:
+            return self.browse()
+        self.timed('shg_dashboard', self.shg_client.get, '/shg/dashboard/')
+        # Like wallet.js: fetch the current version, then poll for entries after it
+        response = self.timed('shg_wallet_api', self.shg_client.get, '/api/shg/wallet/', {'limit': 0})
+        version = response.json().get('version', 0) if response is not None and response.status_code == 200 else 0
+        for _ in range(self.rng.randint(1, 3)):
+            self.timed('shg_wallet_api', self.shg_client.get, '/api/shg/wallet/', {'since_id': version})
+
+
+class Command(BaseCommand):
+    help = 'Drive a weighted traffic mix through the app from a thread pool and report latency per view.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run.')
+        parser.add_argument('--requests', type=int, default=0,
+                            help='Stop after this many scenarios instead (0 = use --duration).')
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Scenario weights (default "{DEFAULT_MIX}").')
+        parser.add_argument('--seed', type=int, default=7)
+        parser.add_argument('--prefix', default='gen', help='Username prefix of the generated dataset.')
+        parser.add_argument('--generate', action='store_true',
+                            help='Run generate_demo_data with the sizes below before the test.')
+        parser.add_argument('--shgs', type=int, default=100)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--buyers', type=int, default=1000)
+        parser.add_argument('--orders', type=int, default=20000)
+        parser.add_argument('--allow-writes', action='store_true',
+                            help='Confirm that the configured database may receive test orders and sessions.')
+
+    def handle(self, *args, **options):
+        if not options['allow_writes']:
+            raise CommandError(
+                f"loadtest places orders in {connection.settings_dict['NAME']}; "
+                'point DATABASES at a throwaway copy and pass --allow-writes.'
+            )
+        mix = self._parse_mix(options['mix'])
+        prefix = options['prefix']
+        if options['generate']:
+            call_command(
+                'generate_demo_data', prefix=prefix, seed=options['seed'], shgs=options['shgs'],
+                products=options['products'], buyers=options['buyers'], orders=options['orders'],
+                reviews=options['orders'] // 4, stdout=self.stdout,
+            )
+
+        self.buyers = list(User.objects.filter(username__startswith=f'{prefix}_buyer').order_by('id'))
+        self.shg_users = list(User.objects.filter(username__startswith=f'{prefix}_shg', shg__isnull=False))
+        self.slugs = list(
+            Product.objects.filter(status='live').order_by('id').values_list('slug', flat=True)
+        )
+        self.categories = [value for value, _label in Product.CATEGORY_CHOICES]
+        if not self.buyers or not self.slugs:
+            raise CommandError(f'No "{prefix}_" buyers or live products; run with --generate first.')
+        facets.facet_counts()
+
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+        self._remaining = options['requests']
+        deadline = None if options['requests'] else time.monotonic() + options['duration']
+
+        self.stdout.write(f"Running {options['threads']} threads, mix {options['mix']} ...")
+        began = time.monotonic()
+        with override_settings(ALLOWED_HOSTS=['*']):
+            with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+                futures = [
+                    pool.submit(self._run_worker, random.Random(options['seed'] + i), mix, deadline)
+                    for i in range(options['threads'])
+                ]
+                for future in futures:
+                    future.result()
+        self._report(time.monotonic() - began)
+
+    def _parse_mix(self, value):
+        mix = {}
+        for part in value.split(','):
+            name, _sep, weight = part.partition('=')
+            name = name.strip()
+            if not hasattr(Worker, name) or name.startswith('_'):
+                raise CommandError(f'Unknown scenario "{name}".')
+            try:
+                mix[name] = float(weight or 1)
+            except ValueError:
+                raise CommandError(f'Bad weight for "{name}": {weight}')
+        return mix
+
+    def _take_budget(self):
+        with self._lock:
+            if self._remaining <= 0:
+                return False
+            self._remaining -= 1
+            return True
+
+    def _run_worker(self, rng, mix, deadline):
+        try:
+            worker = Worker(self, rng)
+            names, weights = list(mix), list(mix.values())
+            while (time.monotonic() < deadline) if deadline else self._take_budget():
+                getattr(worker, rng.choices(names, weights=weights)[0])()
+        finally:
+            connection.close()
+
+    def record(self, label, seconds, status):
+        with self._lock:
+            self.samples[label].append(seconds)
+            if status >= 500:
+                self.errors[label] += 1
+
+    def _report(self, elapsed):
+        total = sum(len(values) for values in self.samples.values())
+        self.stdout.write(f'\n{total} requests in {elapsed:.1f}s = {total / elapsed:.1f} req/s\n')
+        header = f"{'view':<20}{'count':>8}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for label in sorted(self.samples, key=lambda name: -len(self.samples[name])):
+            values = sorted(self.samples[label])
+            self.stdout.write(
+                f'{label:<20}{len(values):>8}{self.errors[label]:>8}{len(values) / elapsed:>9.1f}'
+                f'{percentile(values, 0.50) * 1000:>9.1f}{percentile(values, 0.95) * 1000:>9.1f}'
+                f'{percentile(values, 0.99) * 1000:>9.1f}{values[-1] * 1000:>9.1f}'
+            )
+        if any(self.errors.values()):
+            self.stdout.write(self.style.WARNING(f'{sum(self.errors.values())} server errors.'))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from market import outbox
+
+
+class Command(BaseCommand):
+    help = 'Run outbox consumers (ledger notes, notifications) over the events published since their checkpoints.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--consumer', action='append', dest='consumers',
+                            help=f"Consumer to run; repeatable (default: all of {', '.join(sorted(outbox.CONSUMERS))}).")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running, polling every this many seconds (0 = drain once).')
+        parser.add_argument('--replay-from', type=int, default=None, metavar='EVENT_ID',
+                            help='First move the checkpoints back so events after EVENT_ID are handled again.')
+
+    def handle(self, *args, **options):
+        names = options['consumers'] or sorted(outbox.CONSUMERS)
+        unknown = set(names) - set(outbox.CONSUMERS)
+        if unknown:
+            raise CommandError(f"Unknown consumer: {', '.join(sorted(unknown))}")
+        if options['replay_from'] is not None:
+            for name in names:
+                outbox.reset(name, options['replay_from'])
+
+        while True:
+            for name in names:
+                scanned = outbox.drain(name, batch_size=options['batch_size'])
+                if scanned or not options['interval']:
+                    self.stdout.write(f'{name}: processed {scanned} events.')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from market import facets
+
+
+class Command(BaseCommand):
+    help = 'Recompute marketplace facet counts from the live catalog.'
+
+    def handle(self, *args, **options):
+        totals = facets.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len([n for n in totals.values() if n])} facet counts.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from market import ledger
+
+
+class Command(BaseCommand):
+    help = 'Recompute the monthly ledger rollups (LedgerMonth) from all ledger entries.'
+
+    def handle(self, *args, **options):
+        count = ledger.rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} monthly ledger rollups.'))
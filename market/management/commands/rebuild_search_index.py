@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from market import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text product search index from all live products.'
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            self.stdout.write(self.style.WARNING('Full-text search needs SQLite FTS5; nothing to rebuild.'))
+            return
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} live products.'))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from market import inventory
+
+
+class Command(BaseCommand):
+    help = 'Return the stock of expired checkout holds to their products.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running, sweeping every this many seconds (0 = sweep once).')
+
+    def handle(self, *args, **options):
+        while True:
+            released = inventory.release_expired(batch_size=options['batch_size'])
+            self.stdout.write(f'Released {released} expired holds.')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
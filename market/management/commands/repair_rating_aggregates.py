@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from market import ratings
+
+
+class Command(BaseCommand):
+    help = 'Recompute product rating counts, sums and histograms from reviews.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = ratings.recompute(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Recomputed ratings for {count} reviewed products.'))
@@ -0,0 +1,83 @@
+"""
+Run background jobs (see market/jobs.py) in a pool of worker processes.
+
+Each process sets up Django itself and claims jobs independently, so the
+pool can be sized to the machine; ``--burst`` drains the queue and exits,
+which suits cron and tests. On exit the command prints per-task timings for
+the jobs finished during the run; ``--stats`` prints them for all jobs.
+"""
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+def _work_process(options):
+    # Runs in a fresh spawned process, so Django is set up here and app
+    # modules are imported only afterwards (also why they are not imported at
+    # the top of this module)
+    import django
+    django.setup()
+    from django.db import connection
+
+    from market import jobs
+    try:
+        return jobs.work(batch_size=options['batch_size'], poll=options['poll'],
+                         burst=options['burst'], max_jobs=options['max_jobs'])
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs in a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=getattr(settings, 'JOB_WORKER_PROCESSES', 2),
+                            help='Worker processes (1 = run in this process).')
+        parser.add_argument('--batch-size', type=int, default=1, help='Jobs claimed per query.')
+        parser.add_argument('--poll', type=float, default=2.0, help='Seconds to sleep when nothing is due.')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due.')
+        parser.add_argument('--max-jobs', type=int, default=0, help='Exit each process after this many jobs.')
+        parser.add_argument('--stats', action='store_true', help='Print timings for all jobs and exit.')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self._report()
+            return
+
+        started = timezone.now()
+        began = time.monotonic()
+        worker_options = {key: options[key] for key in ('batch_size', 'poll', 'burst', 'max_jobs')}
+        self.stdout.write(f"Running {options['processes']} worker process(es)...")
+        try:
+            if options['processes'] <= 1:
+                results = [_work_process(worker_options)]
+            else:
+                # spawn: children must not share the parent's database connection
+                context = multiprocessing.get_context('spawn')
+                with context.Pool(options['processes']) as pool:
+                    results = pool.map(_work_process, [worker_options] * options['processes'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped; unfinished jobs are retried once their lease expires.')
+            return
+
+        succeeded = sum(ok for ok, _failed in results)
+        failed = sum(failed for _ok, failed in results)
+        self.stdout.write(f'{succeeded} jobs succeeded, {failed} failed in {time.monotonic() - began:.1f}s.')
+        self._report(since=started)
+
+    def _report(self, since=None):
+        from market import jobs
+
+        header = (f"{'task':<28}{'status':<9}{'jobs':>7}{'tries':>7}"
+                  f"{'avg wait':>10}{'max wait':>10}{'avg ms':>9}{'max ms':>9}")
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in jobs.stats(since=since):
+            self.stdout.write(
+                f"{row['name']:<28}{row['status']:<9}{row['jobs']:>7}{row['most_attempts']:>7}"
+                f"{row['avg_wait'] or 0:>10.0f}{row['max_wait'] or 0:>10}"
+                f"{row['avg_duration'] or 0:>9.0f}{row['max_duration'] or 0:>9}"
+            )
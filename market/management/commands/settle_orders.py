@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from market import settlement
+
+
+class Command(BaseCommand):
+    help = 'Credit SHG wallets for delivered orders that have not been settled yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running, settling every this many seconds (0 = settle once).')
+
+    def handle(self, *args, **options):
+        while True:
+            orders = shgs = 0
+            while True:
+                settled, payouts = settlement.settle_batch(batch_size=options['batch_size'])
+                if not settled:
+                    break
+                orders += settled
+                shgs += len(payouts)
+            self.stdout.write(f'Settled {orders} orders in {shgs} SHG payouts.')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
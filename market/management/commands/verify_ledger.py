@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from market import ledger
+from market.models import SHG
+
+
+class Command(BaseCommand):
+    help = 'Check every SHG ledger chain: gapless sequences, running balances and entry hashes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shg', type=int, action='append', help='Only this SHG id (repeatable).')
+        parser.add_argument('--check-wallets', action='store_true',
+                            help='Also compare each final ledger balance with the SHG wallet balance.')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--max-problems', type=int, default=20, help='Problems printed per SHG.')
+
+    def handle(self, *args, **options):
+        wallets = {}
+        if options['check_wallets']:
+            shgs = SHG.objects.all()
+            if options['shg']:
+                shgs = shgs.filter(pk__in=options['shg'])
+            wallets = dict(shgs.values_list('id', 'wallet_balance_paise'))
+
+        shgs = entries = broken = 0
+        for shg_id, count, balance, problems in ledger.verify(options['shg'], chunk_size=options['chunk_size']):
+            shgs += 1
+            entries += count
+            if shg_id in wallets and wallets[shg_id] != balance:
+                problems.append((None, f'ledger balance {ledger.rupees(balance)} != wallet {ledger.rupees(wallets[shg_id])}'))
+            if not problems:
+                continue
+            broken += 1
+            self.stderr.write(f'SHG {shg_id}: {len(problems)} problem(s)')
+            for sequence, message in problems[:options['max_problems']]:
+                self.stderr.write(f'  #{sequence}: {message}' if sequence else f'  {message}')
+
+        summary = f'Checked {entries} entries in {shgs} SHG ledgers'
+        if broken:
+            raise CommandError(f'{summary}: {broken} failed verification.')
+        self.stdout.write(self.style.SUCCESS(f'{summary}: all chains intact.'))
@@ -0,0 +1,151 @@
+"""
+Per-request performance instrumentation for the market views.
+
+For a sampled share of requests routed through ``market.urls`` the
+middleware records the SQL query count, total DB time, repeated queries,
+template render time and response size. It reports them in a
+``Server-Timing`` header and keeps the slowest requests in an in-process ring
+buffer shown on the admin dashboard.
+
+Configured by the ``REQUEST_METRICS`` setting::
+
+    REQUEST_METRICS = {
+        'SAMPLE_RATE': 1.0,   # share of requests to instrument, 0..1
+        'SLOW_MS': 500,       # requests at least this slow go into the buffer
+        'BUFFER_SIZE': 100,   # slow requests kept in memory
+    }
+"""
+import contextvars
+import random
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template as DjangoTemplate
+from django.utils import timezone
+
+DEFAULTS = {
+    'SAMPLE_RATE': 1.0,
+    'SLOW_MS': 500,
+    'BUFFER_SIZE': 100,
+}
+
+_active = contextvars.ContextVar('request_metrics', default=None)
+_slow_requests = None
+_slow_lock = threading.Lock()
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'REQUEST_METRICS', {})}
+
+
+def _buffer():
+    global _slow_requests
+    if _slow_requests is None:
+        _slow_requests = deque(maxlen=get_config()['BUFFER_SIZE'])
+    return _slow_requests
+
+
+def slow_requests():
+    """Recorded slow requests, most recent first."""
+    with _slow_lock:
+        return list(reversed(_buffer()))
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.query_count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicate_queries(self):
+        """Number of executions of a statement beyond its first (N+1 patterns)."""
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+
+def _instrumented_render(render):
+    def wrapper(self, context=None, request=None):
+        metrics = _active.get()
+        if metrics is None:
+            return render(self, context, request)
+        # Only time the outermost render; includes are part of it
+        metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            metrics.template_depth -= 1
+            if metrics.template_depth == 0:
+                metrics.template_time += time.perf_counter() - start
+    wrapper._request_metrics = True
+    return wrapper
+
+
+if not getattr(DjangoTemplate.render, '_request_metrics', False):
+    DjangoTemplate.render = _instrumented_render(DjangoTemplate.render)
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = get_config()
+
+    def __call__(self, request):
+        if random.random() >= self.config['SAMPLE_RATE']:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _active.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _active.reset(token)
+        total = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        if match is None or match.namespace != 'market':
+            return response
+
+        size = None if response.streaming else len(response.content)
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.query_count} queries, '
+            f'{metrics.duplicate_queries} repeated"',
+            f'tpl;dur={metrics.template_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+        if total * 1000 >= self.config['SLOW_MS']:
+            with _slow_lock:
+                _buffer().append({
+                    'at': timezone.now(),
+                    'method': request.method,
+                    'path': request.path,
+                    'view': match.view_name,
+                    'status': response.status_code,
+                    'total_ms': round(total * 1000, 1),
+                    'db_ms': round(metrics.db_time * 1000, 1),
+                    'queries': metrics.query_count,
+                    'duplicates': metrics.duplicate_queries,
+                    'template_ms': round(metrics.template_time * 1000, 1),
+                    'size': size,
+                })
+        return response
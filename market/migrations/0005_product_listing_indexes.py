@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0004_product_removal_requested'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='product_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['status', 'category', '-created_at', '-id'], name='product_status_cat_idx'),
+        ),
+    ]
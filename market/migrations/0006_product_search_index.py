@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS market_product_fts USING fts5("
+        "title, description, category, shg_name, shg_city, shg_state, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO market_product_fts (rowid, title, description, category, shg_name, shg_city, shg_state) "
+        "SELECT p.id, p.title, p.description, p.category, s.name, s.city, s.state "
+        "FROM market_product p INNER JOIN market_shg s ON s.id = p.shg_id "
+        "WHERE p.status = 'live'"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS market_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0005_product_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
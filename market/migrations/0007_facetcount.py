@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:56
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+PRICE_BUCKETS = [
+    ('0-250', 0, 250),
+    ('250-500', 250, 500),
+    ('500-1000', 500, 1000),
+    ('1000+', 1000, None),
+]
+
+
+def populate_facet_counts(apps, schema_editor):
+    Product = apps.get_model('market', 'Product')
+    FacetCount = apps.get_model('market', 'FacetCount')
+
+    live = Product.objects.filter(status='live')
+    totals = Counter()
+    for field, facet in [('category', 'category'),
+                         ('shg__verification_level', 'verification_level'),
+                         ('shg__state', 'state')]:
+        for row in live.values(field).annotate(n=Count('id')):
+            totals[(facet, row[field])] += row['n']
+    for key, low, high in PRICE_BUCKETS:
+        bucket = live.filter(price__gte=low)
+        if high is not None:
+            bucket = bucket.filter(price__lt=high)
+        totals[('price', key)] = bucket.count()
+
+    FacetCount.objects.bulk_create([
+        FacetCount(facet=facet, value=value, count=count)
+        for (facet, value), count in totals.items() if count
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0006_product_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=30)),
+                ('value', models.CharField(max_length=100)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('facet', 'value')},
+            },
+        ),
+        migrations.RunPython(populate_facet_counts, migrations.RunPython.noop),
+    ]
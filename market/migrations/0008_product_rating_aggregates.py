@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:57
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Product = apps.get_model('market', 'Product')
+    ProductReview = apps.get_model('market', 'ProductReview')
+
+    annotations = {'count': Count('id'), 'total': Sum('rating')}
+    for stars in range(1, 6):
+        annotations[f'stars_{stars}'] = Count('id', filter=Q(rating=stars))
+
+    products = []
+    for row in ProductReview.objects.order_by().values('product_id').annotate(**annotations):
+        product = Product(pk=row['product_id'])
+        product.rating_count = row['count']
+        product.rating_sum = row['total']
+        product.rating_avg = row['total'] / row['count']
+        for stars in range(1, 6):
+            setattr(product, f'rating_{stars}', row[f'stars_{stars}'])
+        products.append(product)
+
+    fields = ['rating_count', 'rating_sum', 'rating_avg'] + [f'rating_{stars}' for stars in range(1, 6)]
+    Product.objects.bulk_update(products, fields, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0007_facetcount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['status', '-rating_avg', '-id'], name='product_status_rating_idx'),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
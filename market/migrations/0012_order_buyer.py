@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def backfill_order_buyers(apps, schema_editor):
+    """
+    Link existing orders to their buyer. Orders paid through a reservation
+    know their user; older ones are matched on the name the views used to
+    compare ("first last", or the username), skipping names shared by
+    several accounts.
+    """
+    Order = apps.get_model('market', 'Order')
+    Reservation = apps.get_model('market', 'Reservation')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+
+    reserved = dict(
+        Reservation.objects.filter(order__isnull=False).values_list('order_id', 'user_id')
+    )
+    by_name = {}
+    for user_id, username, first_name, last_name in User.objects.values_list(
+        'id', 'username', 'first_name', 'last_name'
+    ):
+        full_name = f"{first_name} {last_name}".strip()
+        for name in {full_name.lower(), username.lower()} - {''}:
+            by_name.setdefault(name, set()).add(user_id)
+
+    last_id = 0
+    while True:
+        batch = list(
+            Order.objects.filter(id__gt=last_id, buyer__isnull=True)
+            .order_by('id').only('id', 'buyer_name')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+        linked = []
+        for order in batch:
+            candidates = by_name.get(order.buyer_name.strip().lower(), set())
+            buyer_id = reserved.get(order.id) or (next(iter(candidates)) if len(candidates) == 1 else None)
+            if buyer_id:
+                order.buyer_id = buyer_id
+                linked.append(order)
+        Order.objects.bulk_update(linked, ['buyer'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0011_reservation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='buyer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['buyer', '-created_at'], name='order_buyer_created_idx'),
+        ),
+        migrations.RunPython(backfill_order_buyers, migrations.RunPython.noop),
+    ]
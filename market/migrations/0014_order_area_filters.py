@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def backfill_order_areas(apps, schema_editor):
+    Order = apps.get_model('market', 'Order')
+
+    last_id = 0
+    while True:
+        batch = list(Order.objects.filter(id__gt=last_id).order_by('id').only('id', 'address')[:BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        for order in batch:
+            parts = [part.strip() for part in order.address.split(',') if part.strip()]
+            order.area = (parts[-2] if len(parts) >= 2 else parts[-1])[:100] if parts else ''
+        Order.objects.bulk_update(batch, ['area'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0013_checkout'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='area',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.RunPython(backfill_order_areas, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at', '-id'], name='order_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='order_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['area', '-created_at', '-id'], name='order_area_created_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0018_order_settled_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ledgerentry',
+            index=models.Index(fields=['shg', '-date', '-id'], name='ledger_shg_date_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:32
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def build_ledger_months(apps, schema_editor):
+    LedgerEntry = apps.get_model('market', 'LedgerEntry')
+    LedgerMonth = apps.get_model('market', 'LedgerMonth')
+
+    months = (
+        LedgerEntry.objects.annotate(month=TruncMonth('date'))
+        .values('shg_id', 'month')
+        .annotate(credits=Sum('credit'), debits=Sum('debit'), entries=Count('id'))
+        .order_by('shg_id', 'month')
+    )
+    rows = []
+    balance, current_shg = Decimal(0), None
+    for row in months.iterator():
+        if row['shg_id'] != current_shg:
+            balance, current_shg = Decimal(0), row['shg_id']
+        balance += Decimal(row['credits'] or 0) - Decimal(row['debits'] or 0)
+        rows.append(LedgerMonth(
+            shg_id=row['shg_id'], month=row['month'], credits=row['credits'] or 0,
+            debits=row['debits'] or 0, entries=row['entries'], closing_balance=balance,
+        ))
+    LedgerMonth.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0019_ledger_shg_date_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('credits', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('debits', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('entries', models.PositiveIntegerField(default=0)),
+                ('closing_balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('shg', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_months', to='market.shg')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('shg', 'month'), name='ledger_month_unique')],
+            },
+        ),
+        migrations.RunPython(build_ledger_months, migrations.RunPython.noop),
+    ]
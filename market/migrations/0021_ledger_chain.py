@@ -0,0 +1,182 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:05
+
+import hashlib
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations, models
+
+GENESIS_HASH = '0' * 64
+
+
+# Frozen copy of market.ledger.chain_hash
+def chain_hash(previous_hash, shg_id, sequence, day, description, credit_paise, debit_paise, balance_paise):
+    payload = '|'.join(str(part) for part in (
+        previous_hash, shg_id, sequence, day.isoformat(), description, credit_paise, debit_paise, balance_paise,
+    ))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def to_paise(amount):
+    return int((Decimal(amount or 0) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def chain_entries(apps, schema_editor):
+    """
+    Number each SHG's entries in insertion order and chain them. Balances are
+    recomputed as running sums of the amounts; the old ``balance_after``
+    copied the wallet balance at write time and could disagree with them.
+    """
+    LedgerEntry = apps.get_model('market', 'LedgerEntry')
+
+    shg_ids = LedgerEntry.objects.order_by().values_list('shg_id', flat=True).distinct()
+    for shg_id in list(shg_ids):
+        sequence, balance, previous_hash = 0, 0, GENESIS_HASH
+        entries = list(
+            LedgerEntry.objects.filter(shg_id=shg_id).order_by('id')
+            .only('id', 'shg_id', 'date', 'description', 'credit', 'debit')
+        )
+        for entry in entries:
+            sequence += 1
+            entry.credit_paise, entry.debit_paise = to_paise(entry.credit), to_paise(entry.debit)
+            balance += entry.credit_paise - entry.debit_paise
+            entry.sequence, entry.balance_paise = sequence, balance
+            entry.entry_hash = previous_hash = chain_hash(
+                previous_hash, shg_id, sequence, entry.date, entry.description,
+                entry.credit_paise, entry.debit_paise, balance,
+            )
+        LedgerEntry.objects.bulk_update(
+            entries, ['sequence', 'credit_paise', 'debit_paise', 'balance_paise', 'entry_hash'], batch_size=500,
+        )
+
+
+def months_to_paise(apps, schema_editor):
+    LedgerMonth = apps.get_model('market', 'LedgerMonth')
+    months = list(LedgerMonth.objects.only('id', 'credits', 'debits', 'closing_balance'))
+    for month in months:
+        month.credits_paise = to_paise(month.credits)
+        month.debits_paise = to_paise(month.debits)
+        month.closing_balance_paise = to_paise(month.closing_balance)
+    LedgerMonth.objects.bulk_update(
+        months, ['credits_paise', 'debits_paise', 'closing_balance_paise'], batch_size=500,
+    )
+
+
+def months_to_rupees(apps, schema_editor):
+    LedgerMonth = apps.get_model('market', 'LedgerMonth')
+    months = list(LedgerMonth.objects.only('id', 'credits_paise', 'debits_paise', 'closing_balance_paise'))
+    for month in months:
+        month.credits = Decimal(month.credits_paise).scaleb(-2)
+        month.debits = Decimal(month.debits_paise).scaleb(-2)
+        month.closing_balance = Decimal(month.closing_balance_paise).scaleb(-2)
+    LedgerMonth.objects.bulk_update(months, ['credits', 'debits', 'closing_balance'], batch_size=500)
+
+
+def unchain_entries(apps, schema_editor):
+    LedgerEntry = apps.get_model('market', 'LedgerEntry')
+    entries = list(LedgerEntry.objects.only('id', 'credit_paise', 'debit_paise', 'balance_paise'))
+    for entry in entries:
+        entry.credit = Decimal(entry.credit_paise).scaleb(-2)
+        entry.debit = Decimal(entry.debit_paise).scaleb(-2)
+        entry.balance_after = Decimal(entry.balance_paise).scaleb(-2)
+    LedgerEntry.objects.bulk_update(entries, ['credit', 'debit', 'balance_after'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0020_ledgermonth'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ledgerentry',
+            name='sequence',
+            field=models.PositiveBigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='ledgerentry',
+            name='credit_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ledgerentry',
+            name='debit_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ledgerentry',
+            name='balance_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ledgerentry',
+            name='entry_hash',
+            field=models.CharField(default='', max_length=64),
+        ),
+        # A default lets the column come back if this migration is reversed
+        migrations.AlterField(
+            model_name='ledgerentry',
+            name='balance_after',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.RunPython(chain_entries, unchain_entries),
+        migrations.RemoveField(
+            model_name='ledgerentry',
+            name='credit',
+        ),
+        migrations.RemoveField(
+            model_name='ledgerentry',
+            name='debit',
+        ),
+        migrations.RemoveField(
+            model_name='ledgerentry',
+            name='balance_after',
+        ),
+        migrations.AlterField(
+            model_name='ledgerentry',
+            name='sequence',
+            field=models.PositiveBigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='ledgerentry',
+            name='balance_paise',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='ledgerentry',
+            name='entry_hash',
+            field=models.CharField(max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name='ledgerentry',
+            constraint=models.UniqueConstraint(fields=('shg', 'sequence'), name='ledger_shg_sequence_unique'),
+        ),
+        migrations.AddField(
+            model_name='ledgermonth',
+            name='credits_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ledgermonth',
+            name='debits_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ledgermonth',
+            name='closing_balance_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(months_to_paise, months_to_rupees),
+        migrations.RemoveField(
+            model_name='ledgermonth',
+            name='credits',
+        ),
+        migrations.RemoveField(
+            model_name='ledgermonth',
+            name='debits',
+        ),
+        migrations.RemoveField(
+            model_name='ledgermonth',
+            name='closing_balance',
+        ),
+    ]
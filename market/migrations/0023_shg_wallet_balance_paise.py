@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:40
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations, models
+
+
+def to_paise(amount):
+    return int((Decimal(amount or 0) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def wallets_to_paise(apps, schema_editor):
+    SHG = apps.get_model('market', 'SHG')
+    shgs = list(SHG.objects.only('id', 'wallet_balance'))
+    for shg in shgs:
+        shg.wallet_balance_paise = to_paise(shg.wallet_balance)
+    SHG.objects.bulk_update(shgs, ['wallet_balance_paise'], batch_size=500)
+
+
+def wallets_to_rupees(apps, schema_editor):
+    SHG = apps.get_model('market', 'SHG')
+    shgs = list(SHG.objects.only('id', 'wallet_balance_paise'))
+    for shg in shgs:
+        shg.wallet_balance = Decimal(shg.wallet_balance_paise).scaleb(-2)
+    SHG.objects.bulk_update(shgs, ['wallet_balance'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0022_deletedproduct'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shg',
+            name='wallet_balance_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(wallets_to_paise, wallets_to_rupees),
+        migrations.RemoveField(
+            model_name='shg',
+            name='wallet_balance',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0023_shg_wallet_balance_paise'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ledgerentry',
+            name='event_id',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+    ]
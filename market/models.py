@@ -1,6 +1,9 @@
+from decimal import Decimal
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils.text import slugify
+from django.utils import timezone
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 
@@ -22,13 +25,18 @@ class SHG(models.Model):
     description = models.TextField(blank=True)
     verification_level = models.CharField(max_length=10, choices=VERIFICATION_CHOICES, default='bronze')
     logo = models.ImageField(upload_to='shg_logos/', blank=True, null=True)
-    wallet_balance = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    # Integer paise, raised with F() updates by market.settlement
+    wallet_balance_paise = models.BigIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.name
 
+    @property
+    def wallet_balance(self):
+        return Decimal(self.wallet_balance_paise).scaleb(-2)
+
 
 class Product(models.Model):
     STATUS_CHOICES = [
@@ -57,30 +65,219 @@ class Product(models.Model):
     inventory = models.PositiveIntegerField(default=0)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
     removal_requested = models.BooleanField(default=False)
+    # Review aggregates, maintained by market.signals (see repair_rating_aggregates)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_avg = models.FloatField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the live catalog, newest first
+            models.Index(fields=['status', '-created_at', '-id'], name='product_status_created_idx'),
+            models.Index(fields=['status', 'category', '-created_at', '-id'], name='product_status_cat_idx'),
+            models.Index(fields=['status', '-rating_avg', '-id'], name='product_status_rating_idx'),
+        ]
     
+    RATING_FIELDS = {
+        'rating_count', 'rating_sum', 'rating_avg',
+        'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5',
+    }
+    # Written only through F() updates: ratings by market.signals, stock by market.inventory
+    F_UPDATED_FIELDS = RATING_FIELDS | {'inventory'}
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # Never overwrite F()-maintained fields with the values loaded
+            # alongside this instance.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.F_UPDATED_FIELDS
+            ]
         super().save(*args, **kwargs)
     
     def __str__(self):
         return self.title
 
+    @property
+    def rating_histogram(self):
+        """List of (stars, count) from 5 stars down to 1."""
+        return [(stars, getattr(self, f'rating_{stars}')) for stars in range(5, 0, -1)]
+
+
+class DeletedProduct(models.Model):
+    """A hard-deleted product, recorded by signals so catalog export deltas can tombstone it."""
+    product_id = models.BigIntegerField(unique=True)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.product_id} deleted {self.deleted_at}"
+
+
+class FacetCount(models.Model):
+    """Number of live products per marketplace facet value, maintained by signals."""
+    facet = models.CharField(max_length=30)
+    value = models.CharField(max_length=100)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['facet', 'value']
+
+    def __str__(self):
+        return f"{self.facet}={self.value}: {self.count}"
+
+
+class MediaBlob(models.Model):
+    """Reference count for a stored media file shared by products and SHG logos."""
+    name = models.CharField(max_length=255, unique=True)
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+
+class ImageRendition(models.Model):
+    """A resized/re-encoded copy of an uploaded image, generated by market.renditions."""
+    FORMAT_CHOICES = [
+        ('webp', 'WebP'),
+        ('jpeg', 'JPEG'),
+    ]
+
+    source = models.CharField(max_length=255, db_index=True)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    path = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['source', 'width', 'format']
+
+    def __str__(self):
+        return f"{self.source} @{self.width}w {self.format}"
+
+
+class LedgerEntryQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        raise TypeError('Ledger entries are append-only.')
+
+    def delete(self):
+        raise TypeError('Ledger entries are append-only.')
+
 
 class LedgerEntry(models.Model):
+    """
+    One line of an SHG's append-only ledger, written by market.ledger.record.
+
+    Amounts are integer paise. ``sequence`` numbers each SHG's entries from 1,
+    ``balance_paise`` is the running balance after the entry and
+    ``entry_hash`` chains it to the previous entry (see market.ledger.chain_hash).
+    Notes written from the outbox keep their ``event_id``, so a replayed event
+    is not recorded twice.
+    """
     shg = models.ForeignKey(SHG, on_delete=models.CASCADE)
+    sequence = models.PositiveBigIntegerField()
     date = models.DateField()
     description = models.CharField(max_length=200)
-    credit = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
-    debit = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
-    balance_after = models.DecimalField(max_digits=10, decimal_places=2)
+    credit_paise = models.BigIntegerField(default=0)
+    debit_paise = models.BigIntegerField(default=0)
+    balance_paise = models.BigIntegerField()
+    entry_hash = models.CharField(max_length=64)
+    event_id = models.BigIntegerField(null=True, blank=True, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    
+
+    objects = LedgerEntryQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['shg', '-date', '-id'], name='ledger_shg_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['shg', 'sequence'], name='ledger_shg_sequence_unique'),
+        ]
+
     def __str__(self):
         return f"{self.shg.name} - {self.description}"
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise TypeError('Ledger entries are append-only.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise TypeError('Ledger entries are append-only.')
+
+    # Rupee amounts for display
+    @property
+    def credit(self):
+        return Decimal(self.credit_paise).scaleb(-2)
+
+    @property
+    def debit(self):
+        return Decimal(self.debit_paise).scaleb(-2)
+
+    @property
+    def balance_after(self):
+        return Decimal(self.balance_paise).scaleb(-2)
+
+
+class LedgerMonth(models.Model):
+    """
+    Per-SHG monthly totals of LedgerEntry, kept current by market.ledger.record.
+    Amounts are integer paise; ``closing_balance_paise`` is the net of all
+    entries up to the end of the month.
+    """
+    shg = models.ForeignKey(SHG, on_delete=models.CASCADE, related_name='ledger_months')
+    month = models.DateField(help_text='First day of the month')
+    credits_paise = models.BigIntegerField(default=0)
+    debits_paise = models.BigIntegerField(default=0)
+    entries = models.PositiveIntegerField(default=0)
+    closing_balance_paise = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['shg', 'month'], name='ledger_month_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.shg_id} {self.month:%Y-%m}"
+
+    # Rupee amounts for display
+    @property
+    def credits(self):
+        return Decimal(self.credits_paise).scaleb(-2)
+
+    @property
+    def debits(self):
+        return Decimal(self.debits_paise).scaleb(-2)
+
+    @property
+    def closing_balance(self):
+        return Decimal(self.closing_balance_paise).scaleb(-2)
+
+
+class Checkout(models.Model):
+    """One cart purchase; it creates an Order per product line, possibly across several SHGs."""
+    buyer = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='checkouts')
+    buyer_name = models.CharField(max_length=100)
+    buyer_contact = models.CharField(max_length=20)
+    address = models.TextField()
+    payment_method = models.CharField(max_length=10)
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Checkout {self.id} - {self.buyer_name}"
+
 
 class Order(models.Model):
     STATUS_CHOICES = [
@@ -90,20 +287,146 @@ class Order(models.Model):
         ('delivered', _('Delivered')),
         ('cancelled', _('Cancelled')),
     ]
+
+    # Allowed status changes; see market.orders.transition
+    TRANSITIONS = {
+        'pending_admin_approval': ('approved', 'cancelled'),
+        'approved': ('shipped', 'cancelled'),
+        'shipped': ('delivered',),
+        'delivered': (),
+        'cancelled': (),
+    }
     
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    buyer = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
+    checkout = models.ForeignKey(Checkout, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
     buyer_name = models.CharField(max_length=100)
     buyer_contact = models.CharField(max_length=20)
     address = models.TextField()
+    # Locality parsed from the address (see market.orders.area_from_address), for filtering
+    area = models.CharField(max_length=100, blank=True, default='')
+    quantity = models.PositiveIntegerField(default=1)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=30, choices=STATUS_CHOICES, default='pending_admin_approval')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # When the amount was credited to the SHG wallet (see market.settlement)
+    settled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['buyer', '-created_at'], name='order_buyer_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='order_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='order_status_created_idx'),
+            models.Index(fields=['area', '-created_at', '-id'], name='order_area_created_idx'),
+            models.Index(fields=['status', 'settled_at', 'id'], name='order_settlement_idx'),
+        ]
     
     def __str__(self):
         return f"Order {self.id} - {self.product.title}"
 
 
+class Reservation(models.Model):
+    """
+    A time-limited hold on product stock between the order form and payment.
+
+    Stock is taken out of ``Product.inventory`` when the hold is created; a
+    hold is either committed to an order or released back (see market.inventory).
+    """
+    STATUS_CHOICES = [
+        ('held', _('Held')),
+        ('committed', _('Committed')),
+        ('released', _('Released')),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='held')
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='reservation_status_exp_idx'),
+        ]
+
+    def __str__(self):
+        return f"Reservation {self.id} - {self.product_id} x{self.quantity} ({self.status})"
+
+
+class IdempotencyKey(models.Model):
+    """
+    A payment form submission token. The first POST carrying a key records
+    the order (or cart checkout) it produced; replays return that result
+    instead of paying again.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, null=True, blank=True)
+    checkout = models.ForeignKey(Checkout, on_delete=models.CASCADE, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.key
+
+
+class OutboxEvent(models.Model):
+    """
+    An append-only record of an order or product change, written in the same
+    transaction as the change and processed later by market.outbox consumers.
+    """
+    topic = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.id} {self.topic}"
+
+
+class OutboxCheckpoint(models.Model):
+    """The last OutboxEvent id a consumer has fully processed."""
+    consumer = models.CharField(max_length=50, unique=True)
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.consumer} @ {self.last_event_id}"
+
+
+class Job(models.Model):
+    """A unit of background work run by ``manage.py runworker`` (see market.jobs)."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    wait_ms = models.PositiveIntegerField(null=True, blank=True)
+    duration_ms = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_status_run_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
+
+
 class DigiCourse(models.Model):
     LANGUAGE_CHOICES = [
         ('hindi', _('Hindi')),
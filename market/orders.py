@@ -0,0 +1,200 @@
+"""
+Placing orders and moving them through their statuses.
+
+A cart checkout is one transaction: stock for every line is taken with
+conditional UPDATEs, the ``Checkout`` and its ``Order`` rows are inserted
+with ``bulk_create``, and one ``order.placed`` outbox event is published per
+SHG involved, so the ledger consumer writes a single pending row for its
+share rather than one per item.
+
+Payment forms carry an idempotency key (``new_idempotency_key``). The first
+submission claims it in the same transaction as the order it creates, so a
+double-tapped "Pay" finds the claimed key and returns the original result
+without writing anything.
+
+Status changes follow ``Order.TRANSITIONS``. ``transition`` applies one
+target status to any number of orders with a single UPDATE guarded by the
+allowed source statuses, then runs the side effects for the whole batch.
+Ledger notes are written by the outbox consumers (market.consumers), not on
+the request path.
+"""
+import re
+import uuid
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Now
+
+from . import inventory, jobs, outbox
+from .models import Checkout, IdempotencyKey, Order
+
+PAYMENT_METHODS = {
+    'card': 'Card',
+    'upi': 'UPI',
+    'cod': 'Cash on Delivery',
+}
+
+
+_IDEMPOTENCY_KEY_RE = re.compile(r'^[A-Za-z0-9-]{16,64}$')
+
+
+def new_idempotency_key():
+    return uuid.uuid4().hex
+
+
+def clean_idempotency_key(value):
+    """The submitted key, or None if it is missing or malformed."""
+    return value if value and _IDEMPOTENCY_KEY_RE.match(value) else None
+
+
+def previous_result(key, user):
+    """The IdempotencyKey already used by ``user`` for ``key`` with a recorded result, if any."""
+    if not key:
+        return None
+    return (
+        IdempotencyKey.objects.filter(key=key, user=user)
+        .exclude(order__isnull=True, checkout__isnull=True)
+        .first()
+    )
+
+
+def claim_idempotency_key(key, user):
+    """
+    Claim ``key`` inside the caller's transaction. Returns None when this
+    request owns it, otherwise the existing row (whose result may be empty
+    if the first request is still running or belongs to another user).
+    A failed payment rolls the claim back, so the key can be retried.
+    """
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(key=key, user=user)
+    except IntegrityError:
+        return IdempotencyKey.objects.filter(key=key).first()
+    return None
+
+
+def area_from_address(address):
+    """
+    The locality of a free-form address: the second-to-last comma-separated
+    part ("House 12, Malviya Nagar, Jaipur" -> "Malviya Nagar").
+    """
+    parts = [part.strip() for part in (address or '').split(',') if part.strip()]
+    if not parts:
+        return ''
+    return (parts[-2] if len(parts) >= 2 else parts[-1])[:100]
+
+
+class OutOfStock(Exception):
+    """Raised when some cart lines cannot be filled; ``products`` lists them."""
+
+    def __init__(self, products):
+        super().__init__(', '.join(product.title for product in products))
+        self.products = products
+
+
+class DuplicateSubmission(Exception):
+    """The idempotency key was already used; ``previous`` is its IdempotencyKey row."""
+
+    def __init__(self, previous):
+        super().__init__(previous.key)
+        self.previous = previous
+
+
+def place_checkout(buyer, lines, buyer_name, buyer_contact, address, payment_method, idempotency_key=None):
+    """
+    Buy ``lines`` (``[(product, quantity), ...]``, products with ``shg``
+    loaded) in one transaction. Returns the Checkout; raises OutOfStock and
+    writes nothing if any line is short, or DuplicateSubmission if
+    ``idempotency_key`` was already claimed.
+    """
+    method_label = PAYMENT_METHODS.get(payment_method, PAYMENT_METHODS['card'])
+    with transaction.atomic():
+        if idempotency_key:
+            previous = claim_idempotency_key(idempotency_key, buyer)
+            if previous is not None:
+                raise DuplicateSubmission(previous)
+        short = inventory.take_many({product.pk: quantity for product, quantity in lines})
+        if short:
+            raise OutOfStock([product for product, _quantity in lines if product.pk in short])
+
+        checkout = Checkout.objects.create(
+            buyer=buyer, buyer_name=buyer_name, buyer_contact=buyer_contact, address=address,
+            payment_method=payment_method,
+            total=sum(product.price * quantity for product, quantity in lines),
+        )
+        orders = Order.objects.bulk_create([
+            Order(
+                product=product, buyer=buyer, checkout=checkout, quantity=quantity,
+                amount=product.price * quantity, buyer_name=buyer_name,
+                buyer_contact=buyer_contact, address=address, area=area_from_address(address),
+                status='pending_admin_approval',
+            )
+            for product, quantity in lines
+        ])
+
+        by_shg = defaultdict(list)
+        for order in orders:
+            by_shg[order.product.shg_id].append(order)
+        outbox.publish_many('order.placed', [
+            placed_payload(shg_id, shg_orders, method_label, checkout_id=checkout.id)
+            for shg_id, shg_orders in by_shg.items()
+        ])
+        if idempotency_key:
+            IdempotencyKey.objects.filter(key=idempotency_key).update(checkout=checkout)
+    return checkout
+
+
+def placed_payload(shg_id, orders, method_label, checkout_id=None):
+    """Payload of an ``order.placed`` event for one SHG's orders (products loaded)."""
+    return {
+        'shg_id': shg_id,
+        'checkout_id': checkout_id,
+        'method': method_label,
+        'orders': [[order.id, order.product.title] for order in orders],
+    }
+
+
+def transition(order_ids, status, reason='admin'):
+    """
+    Move the given orders to ``status``. Orders whose current status does not
+    allow it are left alone. Returns the ids that changed.
+
+    An ``order.status_changed`` event is published per order in the same
+    transaction (the ledger consumer notes cancellations). Cancelling also
+    restocks the products with one UPDATE per product. Delivering queues a
+    settlement job (market.settlement), which credits the SHG wallets.
+    """
+    sources = [source for source, targets in Order.TRANSITIONS.items() if status in targets]
+    with transaction.atomic():
+        rows = list(
+            Order.objects.select_for_update(of=('self',))
+            .filter(pk__in=order_ids, status__in=sources)
+            .values('id', 'product_id', 'product__title', 'product__shg_id', 'quantity')
+        )
+        if not rows:
+            return []
+        changed = [row['id'] for row in rows]
+        Order.objects.filter(pk__in=changed).update(status=status, updated_at=Now())
+        outbox.publish_many('order.status_changed', [
+            {
+                'order_id': row['id'],
+                'shg_id': row['product__shg_id'],
+                'title': row['product__title'],
+                'status': status,
+                'reason': reason,
+            }
+            for row in rows
+        ])
+
+        if status == 'cancelled':
+            _restock(rows)
+        elif status == 'delivered':
+            jobs.enqueue_once('settlement.settle')
+    return changed
+
+
+def _restock(rows):
+    restocked = Counter()
+    for row in rows:
+        restocked[row['product_id']] += row['quantity']
+    inventory.restock_many(restocked)
@@ -0,0 +1,73 @@
+"""
+Transactional outbox for order and product events.
+
+Code that changes orders or products calls ``publish`` inside its own
+transaction, so an ``OutboxEvent`` exists if and only if the change was
+committed. Consumers registered with ``@consumer`` (see market.consumers)
+are run by the ``process_outbox`` command: each reads events after its
+``OutboxCheckpoint`` in id order, handles a batch and advances the
+checkpoint in the same transaction, so every event is applied once per
+consumer. Resetting a checkpoint replays history.
+
+Checkpoints assume event ids become visible in id order, which holds while
+writers are serialised (SQLite ``transaction_mode: IMMEDIATE``).
+"""
+from django.db import transaction
+
+from .models import OutboxCheckpoint, OutboxEvent
+
+CONSUMERS = {}
+
+
+def publish(topic, **payload):
+    """Record one event; call inside the transaction that makes the change."""
+    OutboxEvent.objects.create(topic=topic, payload=payload)
+
+
+def publish_many(topic, payloads):
+    OutboxEvent.objects.bulk_create([OutboxEvent(topic=topic, payload=payload) for payload in payloads])
+
+
+def consumer(name, topics):
+    """Register ``handler(events)`` to receive batches of events with the given topics."""
+    def register(handler):
+        CONSUMERS[name] = (frozenset(topics), handler)
+        return handler
+    return register
+
+
+def process(name, batch_size=500):
+    """
+    Handle the next batch of events for consumer ``name``. Returns the number
+    of events scanned (0 when caught up). Events of other topics are skipped
+    but still move the checkpoint forward.
+    """
+    topics, handler = CONSUMERS[name]
+    with transaction.atomic():
+        checkpoint, _created = OutboxCheckpoint.objects.select_for_update().get_or_create(consumer=name)
+        events = list(
+            OutboxEvent.objects.filter(id__gt=checkpoint.last_event_id).order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+        relevant = [event for event in events if event.topic in topics]
+        if relevant:
+            handler(relevant)
+        checkpoint.last_event_id = events[-1].id
+        checkpoint.save(update_fields=['last_event_id', 'updated_at'])
+    return len(events)
+
+
+def drain(name, batch_size=500):
+    """Process batches until ``name`` is caught up; returns the number of events scanned."""
+    total = 0
+    while True:
+        scanned = process(name, batch_size)
+        total += scanned
+        if scanned < batch_size:
+            return total
+
+
+def reset(name, last_event_id=0):
+    """Move a consumer's checkpoint back so events after ``last_event_id`` are handled again."""
+    OutboxCheckpoint.objects.update_or_create(consumer=name, defaults={'last_event_id': last_event_id})
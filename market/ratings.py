@@ -0,0 +1,61 @@
+"""
+Denormalized review aggregates on ``Product``.
+
+Every review create/delete adjusts the product's count, sum, average and
+per-star histogram with a single ``UPDATE`` built from ``F()`` expressions,
+so concurrent reviews never lose increments and listing pages can show and
+sort by ratings without touching ``ProductReview``.
+"""
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast, Now
+
+from .models import Product, ProductReview
+
+STARS = range(1, 6)
+
+
+def apply_rating(product_id, rating, sign=1):
+    """Add (``sign=1``) or remove (``sign=-1``) one review of ``rating`` stars."""
+    new_count = F('rating_count') + sign
+    new_sum = F('rating_sum') + sign * rating
+    Product.objects.filter(pk=product_id).update(
+        rating_count=new_count,
+        rating_sum=new_sum,
+        rating_avg=Case(
+            When(rating_count=-sign, then=Value(0.0)),
+            default=Cast(new_sum, FloatField()) / new_count,
+            output_field=FloatField(),
+        ),
+        **{f'rating_{rating}': F(f'rating_{rating}') + sign},
+        updated_at=Now(),
+    )
+
+
+def recompute(batch_size=1000):
+    """
+    Rebuild every product's aggregates from ``ProductReview`` in one grouped
+    query. Returns the number of products that have reviews.
+    """
+    annotations = {
+        'count': Count('id'),
+        'total': Sum('rating'),
+    }
+    for stars in STARS:
+        annotations[f'stars_{stars}'] = Count('id', filter=Q(rating=stars))
+    rows = ProductReview.objects.order_by().values('product_id').annotate(**annotations)
+
+    fields = ['rating_count', 'rating_sum', 'rating_avg'] + [f'rating_{stars}' for stars in STARS]
+    products = []
+    with transaction.atomic():
+        Product.objects.update(**{field: 0 for field in fields})
+        for row in rows:
+            product = Product(pk=row['product_id'])
+            product.rating_count = row['count']
+            product.rating_sum = row['total']
+            product.rating_avg = row['total'] / row['count']
+            for stars in STARS:
+                setattr(product, f'rating_{stars}', row[f'stars_{stars}'])
+            products.append(product)
+        Product.objects.bulk_update(products, fields, batch_size=batch_size)
+    return len(products)
@@ -0,0 +1,126 @@
+"""
+Resized and WebP renditions of uploaded images (product photos and SHG logos).
+
+New uploads are rendered by a ``renditions.generate`` background job (see
+market.jobs), so the request that saves an image only queues the work.
+``render_renditions`` only touches the filesystem and Pillow, so the backfill
+command can run it in a process pool while the parent records the results as
+``ImageRendition`` rows. Lookups used by the ``responsive_image`` template
+tag go through the cache so listing pages do not issue a query per card.
+"""
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from . import jobs
+from .models import ImageRendition
+
+WIDTHS = getattr(settings, 'IMAGE_RENDITION_WIDTHS', (320, 640, 1024))
+FORMATS = ('webp', 'jpeg')
+QUALITY = {'webp': 75, 'jpeg': 80}
+WORKERS = getattr(settings, 'IMAGE_RENDITION_WORKERS', 2)
+
+_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _cache_key(source):
+    return 'renditions:' + hashlib.md5(source.encode()).hexdigest()
+
+
+def rendition_dir(source):
+    stem = os.path.splitext(os.path.basename(source))[0]
+    digest = hashlib.sha1(source.encode()).hexdigest()[:8]
+    return f'renditions/{stem}-{digest}'
+
+
+def render_renditions(media_root, source, widths=WIDTHS):
+    """
+    Write the renditions of ``source`` (relative to ``media_root``) and return
+    a list of ``(width, height, format, relative path)``. Never upscales.
+    Runs in worker processes, so it must not use the ORM.
+    """
+    from PIL import Image, ImageOps
+
+    results = []
+    with Image.open(os.path.join(media_root, source)) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ('RGB', 'RGBA'):
+            original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+        target_widths = sorted({min(width, original.width) for width in widths})
+        out_dir = rendition_dir(source)
+        os.makedirs(os.path.join(media_root, out_dir), exist_ok=True)
+
+        for width in target_widths:
+            height = max(1, round(original.height * width / original.width))
+            resized = original.resize((width, height), Image.LANCZOS)
+            for fmt in FORMATS:
+                image = resized.convert('RGB') if fmt == 'jpeg' else resized
+                ext = 'jpg' if fmt == 'jpeg' else fmt
+                path = f'{out_dir}/{width}.{ext}'
+                image.save(os.path.join(media_root, path), fmt.upper(), quality=QUALITY[fmt], optimize=True)
+                results.append((width, height, fmt, path))
+    return results
+
+
+def record_renditions(source, results):
+    """Store rendered files as ImageRendition rows, replacing older ones for ``source``."""
+    with transaction.atomic():
+        ImageRendition.objects.filter(source=source).delete()
+        ImageRendition.objects.bulk_create([
+            ImageRendition(source=source, width=width, height=height, format=fmt, path=path)
+            for width, height, fmt, path in results
+        ])
+    cache.delete(_cache_key(source))
+
+
+@jobs.task('renditions.generate')
+def generate(source):
+    """Render and record renditions for one source in the current process."""
+    results = render_renditions(str(settings.MEDIA_ROOT), source)
+    record_renditions(source, results)
+    return results
+
+
+def schedule(source):
+    """Queue a background job to render ``source``, in the caller's transaction."""
+    if source:
+        jobs.enqueue('renditions.generate', source=source)
+
+
+def generate_many(sources, workers=WORKERS):
+    """
+    Render many sources across ``workers`` processes. Yields
+    ``(source, error)`` as each finishes; ``error`` is None on success.
+    """
+    media_root = str(settings.MEDIA_ROOT)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(render_renditions, media_root, source): source for source in sources}
+        for future in as_completed(futures):
+            source = futures[future]
+            try:
+                record_renditions(source, future.result())
+            except (OSError, ValueError) as exc:
+                yield source, exc
+            else:
+                yield source, None
+
+
+def renditions_for(source):
+    """
+    Return ``{format: [(width, url), ...]}`` for ``source``, smallest first,
+    or an empty dict when no renditions exist yet.
+    """
+    key = _cache_key(source)
+    found = cache.get(key)
+    if found is None:
+        found = {}
+        rows = ImageRendition.objects.filter(source=source).order_by('width').values_list('format', 'width', 'path')
+        for fmt, width, path in rows:
+            found.setdefault(fmt, []).append((width, default_storage.url(path)))
+        cache.set(key, found, _CACHE_TIMEOUT)
+    return found
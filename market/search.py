@@ -0,0 +1,157 @@
+"""
+Full-text product search backed by an SQLite FTS5 table.
+
+The ``market_product_fts`` table holds one row per live product (rowid is the
+product id) and is kept in sync by the signal handlers in ``market.signals``.
+On other database backends search falls back to a plain ``icontains`` filter.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+FTS_TABLE = 'market_product_fts'
+
+# bm25() column weights: title, description, category, shg_name, shg_city, shg_state
+RANK_WEIGHTS = (10.0, 1.0, 2.0, 4.0, 2.0, 1.0)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def _match_expression(query):
+    """Turn free text into an FTS5 query: every word must match, as a prefix."""
+    tokens = _TOKEN_RE.findall(query.lower())
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def index_product(product):
+    """Insert or refresh the index row for ``product``; non-live products are dropped."""
+    if not fts_available():
+        return
+    if product.status != 'live':
+        remove_product(product.pk)
+        return
+
+    shg = product.shg
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description, category, shg_name, shg_city, shg_state) '
+            'VALUES (%s, %s, %s, %s, %s, %s, %s)',
+            [product.pk, product.title, product.description, product.category,
+             shg.name, shg.city, shg.state],
+        )
+
+
+def remove_product(product_id):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product_id])
+
+
+def update_shg(shg):
+    """Propagate SHG name/location changes to the index rows of its products."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {FTS_TABLE} SET shg_name = %s, shg_city = %s, shg_state = %s '
+            'WHERE rowid IN (SELECT id FROM market_product WHERE shg_id = %s)',
+            [shg.name, shg.city, shg.state, shg.pk],
+        )
+
+
+def rebuild_index():
+    """Repopulate the index from all live products. Returns the number of rows indexed."""
+    if not fts_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description, category, shg_name, shg_city, shg_state) '
+            'SELECT p.id, p.title, p.description, p.category, s.name, s.city, s.state '
+            'FROM market_product p INNER JOIN market_shg s ON s.id = p.shg_id '
+            "WHERE p.status = 'live'"
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+# ORDER BY for the non-relevance sorts, on the joined product row
+SORT_ORDER = {
+    'newest': ('-created_at', '-id'),
+    'rating': ('-rating_avg', '-id'),
+}
+
+
+def search_product_ids(query, category=None, level=None, state=None, price_range=None, sort=None,
+                       limit=24, offset=0):
+    """
+    Return ids of live products matching ``query`` and the marketplace
+    filters, best match first unless ``sort`` is one of SORT_ORDER. Filters
+    apply before LIMIT/OFFSET, so every page but the last is full.
+    """
+    expression = _match_expression(query)
+    if not expression:
+        return []
+
+    if not fts_available():
+        from .models import Product
+
+        products = Product.objects.filter(status='live').filter(
+            Q(title__icontains=query) | Q(description__icontains=query) | Q(shg__name__icontains=query)
+        )
+        if category:
+            products = products.filter(category=category)
+        if level:
+            products = products.filter(shg__verification_level=level)
+        if state:
+            products = products.filter(shg__state=state)
+        if price_range:
+            low, high = price_range
+            products = products.filter(price__gte=low)
+            if high is not None:
+                products = products.filter(price__lt=high)
+        order = SORT_ORDER.get(sort, SORT_ORDER['newest'])
+        return list(products.order_by(*order).values_list('id', flat=True)[offset:offset + limit])
+
+    sql = (
+        f'SELECT p.id FROM {FTS_TABLE} '
+        f'INNER JOIN market_product p ON p.id = {FTS_TABLE}.rowid '
+        'INNER JOIN market_shg s ON s.id = p.shg_id '
+        f"WHERE {FTS_TABLE} MATCH %s AND p.status = 'live'"
+    )
+    params = [expression]
+    if category:
+        sql += ' AND p.category = %s'
+        params.append(category)
+    if level:
+        sql += ' AND s.verification_level = %s'
+        params.append(level)
+    if state:
+        sql += ' AND s.state = %s'
+        params.append(state)
+    if price_range:
+        low, high = price_range
+        sql += ' AND p.price >= %s'
+        params.append(low)
+        if high is not None:
+            sql += ' AND p.price < %s'
+            params.append(high)
+    if sort in SORT_ORDER:
+        order = ', '.join(f'p.{field[1:]} DESC' for field in SORT_ORDER[sort])
+    else:
+        weights = ', '.join(str(w) for w in RANK_WEIGHTS)
+        order = f'bm25({FTS_TABLE}, {weights})'
+    sql += f' ORDER BY {order} LIMIT %s OFFSET %s'
+    params += [limit, offset]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,67 @@
+"""
+Crediting SHG wallets for delivered orders.
+
+``settle`` works through delivered, unsettled orders in id-ordered batches.
+Each batch is one transaction: the orders are locked and stamped
+``settled_at``, payouts per SHG are added up in integer paise from one
+query over the batch, each SHG's ``wallet_balance_paise`` is raised with an
+integer ``F()`` UPDATE and one credit ``LedgerEntry`` per SHG is
+bulk-inserted through ``ledger.record``. Summing in Python rather than with
+SQL SUM keeps SQLite's floating-point decimal arithmetic out of it. A batch
+costs a fixed number of queries plus a few per SHG in it, however many
+orders it holds, and an order can only be settled once.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import jobs, ledger
+from .models import SHG, LedgerEntry, Order
+
+
+def unsettled():
+    return Order.objects.filter(status='delivered', settled_at__isnull=True)
+
+
+def settle_batch(batch_size=1000, now=None):
+    """Settle up to ``batch_size`` orders. Returns ``(orders settled, {shg_id: payout paise})``."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        ids = list(
+            unsettled().select_for_update(skip_locked=True).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0, {}
+        payouts = {}
+        rows = Order.objects.filter(pk__in=ids).order_by('id').values_list('id', 'product__shg_id', 'amount')
+        for order_id, shg_id, amount in rows:
+            payout = payouts.setdefault(shg_id, {'total': 0, 'orders': 0, 'first': order_id})
+            payout['total'] += ledger.to_paise(amount)
+            payout['orders'] += 1
+        settled = unsettled().filter(pk__in=ids).update(settled_at=now)
+
+        for shg_id, payout in sorted(payouts.items()):
+            SHG.objects.filter(pk=shg_id).update(wallet_balance_paise=F('wallet_balance_paise') + payout['total'])
+        today = timezone.localdate(now)
+        ledger.record([
+            LedgerEntry(shg_id=shg_id, date=today, description=_description(payout), credit_paise=payout['total'])
+            for shg_id, payout in sorted(payouts.items())
+        ])
+    return settled, {shg_id: payout['total'] for shg_id, payout in payouts.items()}
+
+
+def _description(payout):
+    if payout['orders'] == 1:
+        return f"Settlement for Order #{payout['first']}"
+    return f"Settlement for {payout['orders']} delivered orders"
+
+
+@jobs.task('settlement.settle')
+def settle(batch_size=1000):
+    """Settle every delivered order not yet credited. Returns the number settled."""
+    total = 0
+    while True:
+        settled, _payouts = settle_batch(batch_size)
+        total += settled
+        if not settled:
+            return total
@@ -0,0 +1,142 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from . import caching, facets, ratings, renditions, search, storage
+from .models import SHG, DeletedProduct, Product, ProductReview
+
+FACET_FIELDS = {'status', 'category', 'price', 'shg', 'shg_id'}
+
+# Marker for "the stored value was not loaded because the save cannot change it"
+NOT_LOADED = object()
+
+
+@receiver(pre_save, sender=Product)
+def product_pre_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._stored_facets = None
+    instance._stored_slug = None
+    instance._stored_image = NOT_LOADED
+    if raw:
+        return
+    if not instance.pk:
+        instance._stored_facets = []
+        instance._stored_image = ''
+        return
+    if update_fields is not None and not (FACET_FIELDS | {'slug', 'image'}).intersection(update_fields):
+        return
+    row = Product.objects.filter(pk=instance.pk).values('slug', 'image', *facets.STORED_FIELDS).first()
+    instance._stored_facets = facets.stored_facets(row)
+    instance._stored_slug = row['slug'] if row else None
+    instance._stored_image = row['image'] if row else None
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_product(instance)
+    stored = getattr(instance, '_stored_facets', None)
+    if stored is not None:
+        facets.apply_delta(stored, facets.facets_for(instance))
+    caching.bump_catalog()
+    caching.bump_products(instance.slug, getattr(instance, '_stored_slug', None))
+    _image_changed(instance.image, getattr(instance, '_stored_image', NOT_LOADED))
+
+
+@receiver(pre_delete, sender=Product)
+def product_pre_delete(sender, instance, **kwargs):
+    instance._stored_facets = facets.facets_for(instance)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    DeletedProduct.objects.create(product_id=instance.pk)
+    search.remove_product(instance.pk)
+    facets.apply_delta(getattr(instance, '_stored_facets', []), [])
+    caching.bump_catalog()
+    caching.bump_products(instance.slug)
+    storage.release(instance.image.name)
+
+
+@receiver(pre_save, sender=SHG)
+def shg_pre_save(sender, instance, raw=False, **kwargs):
+    instance._stored_location = None
+    instance._stored_logo = '' if not instance.pk else NOT_LOADED
+    if raw or not instance.pk:
+        return
+    row = SHG.objects.filter(pk=instance.pk).values_list('verification_level', 'state', 'logo').first()
+    instance._stored_location = row[:2] if row else None
+    instance._stored_logo = row[2] if row else ''
+
+
+@receiver(post_save, sender=SHG)
+def shg_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    _image_changed(instance.logo, getattr(instance, '_stored_logo', NOT_LOADED))
+    if created:
+        return
+    search.update_shg(instance)
+    caching.bump_catalog()
+    caching.bump_products(*Product.objects.filter(shg=instance).values_list('slug', flat=True))
+
+    stored = getattr(instance, '_stored_location', None)
+    current = (instance.verification_level, instance.state)
+    if stored and stored != current:
+        live_count = Product.objects.filter(shg=instance, status='live').count()
+        facets.apply_delta(
+            [(facets.VERIFICATION, stored[0]), (facets.STATE, stored[1])],
+            [(facets.VERIFICATION, current[0]), (facets.STATE, current[1])],
+            weight=live_count,
+        )
+
+
+@receiver(post_delete, sender=SHG)
+def shg_deleted(sender, instance, **kwargs):
+    if instance.logo:
+        storage.release(instance.logo.name)
+
+
+def _image_changed(image, stored_name):
+    """Move the file reference and queue renditions when an image is uploaded or replaced."""
+    name = image.name if image else ''
+    if stored_name is NOT_LOADED or name == (stored_name or ''):
+        return
+    storage.retain(name)
+    storage.release(stored_name)
+    renditions.schedule(name)
+
+
+@receiver(pre_save, sender=ProductReview)
+def review_pre_save(sender, instance, raw=False, **kwargs):
+    if raw or not instance.pk:
+        instance._stored_rating = None
+        return
+    instance._stored_rating = (
+        ProductReview.objects.filter(pk=instance.pk).values_list('product_id', 'rating').first()
+    )
+
+
+@receiver(post_save, sender=ProductReview)
+def review_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    stored = getattr(instance, '_stored_rating', None)
+    current = (instance.product_id, instance.rating)
+    if stored == current:
+        return
+    if stored:
+        ratings.apply_rating(stored[0], stored[1], sign=-1)
+    ratings.apply_rating(instance.product_id, instance.rating)
+    _bump_review_caches(instance)
+
+
+@receiver(post_delete, sender=ProductReview)
+def review_deleted(sender, instance, **kwargs):
+    ratings.apply_rating(instance.product_id, instance.rating, sign=-1)
+    _bump_review_caches(instance)
+
+
+def _bump_review_caches(review):
+    # Listing cards show the rating too, so the catalog version moves as well
+    caching.bump_catalog()
+    caching.bump_products(*Product.objects.filter(pk=review.product_id).values_list('slug', flat=True))
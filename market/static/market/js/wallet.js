@@ -6,42 +6,102 @@ document.addEventListener('DOMContentLoaded', function() {
     const pageBalanceEl = document.getElementById('wallet-balance-amount');
     const dashboardBalanceEl = document.getElementById('dashboard-wallet-balance');
     const ledgerBody = document.getElementById('ledger-body');
+    const moreButton = document.getElementById('ledger-more');
 
-    function renderWallet(data) {
+    // Id of the newest ledger row we have; polls only ask for rows after it
+    let version = walletContainer.dataset.walletVersion ? parseInt(walletContainer.dataset.walletVersion, 10) : null;
+
+    function cell(text, alignEnd) {
+        const td = document.createElement('td');
+        if (alignEnd) td.className = 'text-end';
+        td.textContent = text;
+        return td;
+    }
+
+    function entryRow(e) {
+        const tr = document.createElement('tr');
+        tr.appendChild(cell(e.date || ''));
+        tr.appendChild(cell(e.description || ''));
+        tr.appendChild(cell(e.credit ? ('₹ ' + e.credit) : '', true));
+        tr.appendChild(cell(e.debit ? ('₹ ' + e.debit) : '', true));
+        tr.appendChild(cell('₹ ' + (e.balance_after || '0'), true));
+        return tr;
+    }
+
+    function removePlaceholder() {
+        const placeholder = ledgerBody.querySelector('td[colspan]');
+        if (placeholder) placeholder.parentNode.remove();
+    }
+
+    function renderBalance(data) {
         if (data && typeof data.balance !== 'undefined') {
             const formatted = '₹ ' + data.balance;
             if (pageBalanceEl) pageBalanceEl.textContent = formatted;
             if (dashboardBalanceEl) dashboardBalanceEl.textContent = formatted;
         }
+    }
 
-        if (!ledgerBody) return;
-
-        const entries = data && Array.isArray(data.entries) ? data.entries : [];
-        if (!entries.length) {
-            ledgerBody.innerHTML = '<tr><td colspan="5" class="text-center text-muted small">No ledger entries yet.</td></tr>';
-            return;
+    function applyDelta(data) {
+        renderBalance(data);
+        if (ledgerBody && data.entries && data.entries.length) {
+            removePlaceholder();
+            // Delta entries arrive oldest first; each new one goes on top
+            data.entries.forEach(function(e) {
+                ledgerBody.insertBefore(entryRow(e), ledgerBody.firstChild);
+            });
         }
-
-        let html = '';
-        entries.forEach(function(e) {
-            html += '<tr>' +
-                '<td>' + (e.date || '') + '</td>' +
-                '<td>' + (e.description || '') + '</td>' +
-                '<td class="text-end">' + (e.credit ? ('₹ ' + e.credit) : '') + '</td>' +
-                '<td class="text-end">' + (e.debit ? ('₹ ' + e.debit) : '') + '</td>' +
-                '<td class="text-end">₹ ' + (e.balance_after || '0') + '</td>' +
-            '</tr>';
-        });
-        ledgerBody.innerHTML = html;
+        if (typeof data.version !== 'undefined') version = data.version;
     }
 
     function pollWallet() {
-        fetch(pollUrl, { credentials: 'same-origin' })
-            .then(function(res) { return res.json(); })
-            .then(renderWallet)
+        const url = pollUrl + (version === null ? '?limit=0' : '?since_id=' + version);
+        fetch(url, { credentials: 'same-origin' })
+            .then(function(res) { return res.status === 304 ? null : res.json(); })
+            .then(function(data) {
+                if (!data) return;
+                applyDelta(data);
+                if (data.has_more) pollWallet();
+            })
             .catch(function() {});
     }
 
-    pollWallet();
-    setInterval(pollWallet, 15000);
+    let pollTimer = null;
+
+    function startPolling() {
+        if (pollTimer !== null) return;
+        pollWallet();
+        pollTimer = setInterval(pollWallet, 15000);
+    }
+
+    // Prefer pushed updates; the server closes the stream (204) when it
+    // cannot push, and then we poll instead
+    const eventsUrl = walletContainer.dataset.walletEventsUrl;
+    if (eventsUrl && window.EventSource) {
+        const source = new EventSource(eventsUrl + (version === null ? '' : '?since_id=' + version));
+        source.addEventListener('ledger', function(event) {
+            applyDelta(JSON.parse(event.data));
+        });
+        source.onerror = function() {
+            if (source.readyState === EventSource.CLOSED) startPolling();
+        };
+    } else {
+        startPolling();
+    }
+
+    if (moreButton) {
+        moreButton.addEventListener('click', function() {
+            moreButton.disabled = true;
+            fetch(pollUrl + '?cursor=' + encodeURIComponent(moreButton.dataset.cursor), { credentials: 'same-origin' })
+                .then(function(res) { return res.json(); })
+                .then(function(data) {
+                    (data.entries || []).forEach(function(e) {
+                        ledgerBody.appendChild(entryRow(e));
+                    });
+                    moreButton.dataset.cursor = data.next_cursor || '';
+                    if (!data.next_cursor) moreButton.parentNode.classList.add('d-none');
+                })
+                .catch(function() {})
+                .then(function() { moreButton.disabled = false; });
+        });
+    }
 });
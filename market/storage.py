@@ -0,0 +1,100 @@
+"""
+Content-addressed media storage.
+
+Uploads are stored under ``<upload_to>/<aa>/<sha256><ext>``, so the same
+image uploaded twice (product variants, admin re-uploads) is written once and
+shared. ``MediaBlob`` rows count how many Product images and SHG logos point
+at each file; ``retain``/``release`` are called from ``market.signals`` and a
+file (with its renditions) is only deleted once nothing references it.
+"""
+import hashlib
+import logging
+import os
+import shutil
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by the SHA-256 of their content."""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            from django.core.files import File
+            content = File(content, name)
+
+        sha = content_hash(content)
+        directory = os.path.dirname(name)
+        ext = os.path.splitext(name)[1].lower()
+        hashed_name = os.path.join(directory, sha[:2], sha + ext).replace('\\', '/')
+        if self.exists(hashed_name):
+            return hashed_name
+        return super().save(hashed_name, content, max_length=max_length)
+
+
+def retain(name):
+    """Record one more reference to the stored file ``name``."""
+    from .models import MediaBlob
+
+    if not name:
+        return
+    if MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1):
+        return
+    try:
+        with transaction.atomic():
+            MediaBlob.objects.create(name=name, ref_count=_count_references(name))
+    except IntegrityError:
+        MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+
+
+def release(name):
+    """Drop one reference to ``name``; the file is deleted after commit once unreferenced."""
+    from .models import MediaBlob
+
+    if not name:
+        return
+    if MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') - 1):
+        remaining = MediaBlob.objects.filter(name=name).values_list('ref_count', flat=True).first()
+    else:
+        # Files uploaded before reference counting: count the rows directly
+        remaining = _count_references(name)
+    if remaining is not None and remaining <= 0:
+        MediaBlob.objects.filter(name=name).delete()
+        transaction.on_commit(lambda: delete_file(name))
+
+
+def _count_references(name):
+    from .models import SHG, Product
+
+    return Product.objects.filter(image=name).count() + SHG.objects.filter(logo=name).count()
+
+
+def delete_file(name):
+    """Delete a media file together with its renditions."""
+    from .models import ImageRendition
+    from .renditions import rendition_dir
+
+    try:
+        default_storage.delete(name)
+    except OSError:
+        logger.exception('Could not delete media file %s', name)
+    ImageRendition.objects.filter(source=name).delete()
+    shutil.rmtree(os.path.join(settings.MEDIA_ROOT, rendition_dir(name)), ignore_errors=True)
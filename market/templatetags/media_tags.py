@@ -0,0 +1,34 @@
+from django import template
+from django.utils.html import format_html
+
+from market.renditions import renditions_for
+
+register = template.Library()
+
+DEFAULT_SIZES = '(max-width: 576px) 100vw, (max-width: 992px) 50vw, 25vw'
+
+
+def _srcset(entries):
+    return ', '.join(f'{url} {width}w' for width, url in entries)
+
+
+@register.simple_tag
+def responsive_image(image, alt='', css_class='', sizes=DEFAULT_SIZES):
+    """
+    Render an image as <picture> with WebP and JPEG srcsets when renditions
+    exist, falling back to the original upload otherwise.
+    """
+    found = renditions_for(image.name)
+    if not found.get('jpeg'):
+        return format_html('<img src="{}" class="{}" alt="{}" loading="lazy">', image.url, css_class, alt)
+
+    jpeg = found['jpeg']
+    webp_source = ''
+    if found.get('webp'):
+        webp_source = format_html(
+            '<source type="image/webp" srcset="{}" sizes="{}">', _srcset(found['webp']), sizes
+        )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" class="{}" alt="{}" loading="lazy"></picture>',
+        webp_source, jpeg[0][1], _srcset(jpeg), sizes, css_class, alt,
+    )
@@ -1,3 +1,272 @@
-from django.test import TestCase
+import json
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone, translation
+
+from . import inventory, ledger, outbox, settlement, views
+from .management.commands.loadtest import percentile
+from .models import SHG, LedgerEntry, LedgerMonth, Order, OutboxCheckpoint, OutboxEvent, Product, Reservation
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """
+    Drive the real ``buyer_order`` -> ``fake_payment`` views from many threads
+    at once, with short holds expiring, the sweeper and admin status changes
+    on a stale product instance running in parallel, and check that stock is never oversold and every unit is accounted for as
+    an order, a live hold or remaining inventory.
+    """
+    BUYERS = 60
+    STOCK = 20
+    THREADS = 12
+    ABANDON = 0.2
+    HOLD_SECONDS = 1.0
+
+    def setUp(self):
+        owner = User.objects.create_user(username='stress_shg')
+        shg = SHG.objects.create(
+            user=owner, name='Stress Test SHG', contact_person='Stress', phone='0000000000',
+            email='stress@example.com', state='Test', city='Test',
+        )
+        self.product = Product.objects.create(
+            shg=shg, title='Stress Test Product', slug='stress-product', description='Stress test.',
+            price=Decimal('100.00'), category='other', inventory=self.STOCK, status='live',
+        )
+        User.objects.bulk_create([User(username=f'stress_buyer{i}') for i in range(self.BUYERS)])
+        self.buyers = list(User.objects.filter(username__startswith='stress_buyer'))
+        with translation.override('en'):
+            self.order_url = reverse('market:buyer_order', args=[self.product.slug])
+            self.payment_url = reverse('market:fake_payment', args=[self.product.slug])
+
+    def _checkout(self, item):
+        buyer, abandons = item
+        client = Client(raise_request_exception=False)
+        try:
+            client.force_login(buyer)
+            response = client.post(self.order_url, {
+                'buyer_name': buyer.username, 'buyer_contact': '9999999999', 'address': '1, Test Area, Test City',
+            })
+            if response.status_code >= 500:
+                return f'{buyer.username}: order form returned {response.status_code}'
+            if abandons or not response.get('Location', '').endswith(self.payment_url):
+                return None
+            response = client.post(self.payment_url, {'payment_method': 'upi'})
+            if response.status_code >= 500:
+                return f'{buyer.username}: payment returned {response.status_code}'
+            return None
+        finally:
+            connection.close()
+
+    def _sweep(self, stop):
+        try:
+            while not stop.wait(0.05):
+                inventory.release_expired()
+        finally:
+            connection.close()
+
+    def _change_status(self, stop, stale):
+        # Saves an instance loaded before any stock moved, as an admin review would
+        try:
+            while not stop.wait(0.02):
+                views._set_product_status(stale, 'live')
+                stale.save()
+        finally:
+            connection.close()
+
+    def test_concurrent_checkout_never_oversells(self):
+        rng = random.Random(1)
+        plan = [(buyer, rng.random() < self.ABANDON) for buyer in self.buyers]
+        stop = threading.Event()
+        background = [
+            threading.Thread(target=self._sweep, args=(stop,)),
+            threading.Thread(target=self._change_status, args=(stop, Product.objects.get(pk=self.product.pk))),
+        ]
+
+        with mock.patch.object(inventory, 'HOLD_SECONDS', self.HOLD_SECONDS):
+            for thread in background:
+                thread.start()
+            try:
+                with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+                    errors = [error for error in pool.map(self._checkout, plan) if error]
+            finally:
+                stop.set()
+                for thread in background:
+                    thread.join()
+
+        self.assertEqual(errors, [])
+        self.product.refresh_from_db()
+        orders = Order.objects.filter(product=self.product).count()
+        held = Reservation.objects.filter(product=self.product, status='held').count()
+        self.assertLessEqual(orders, self.STOCK)
+        self.assertEqual(orders + held + self.product.inventory, self.STOCK)
+
+
+class OutboxDeletedSHGTests(TestCase):
+    def _shg(self, username):
+        return SHG.objects.create(
+            user=User.objects.create_user(username=username), name=username, contact_person='Test',
+            phone='0000000000', email=f'{username}@example.com', state='Test', city='Test',
+        )
+
+    def test_events_for_deleted_shg_do_not_block_the_ledger(self):
+        gone, kept = self._shg('gone'), self._shg('kept')
+        for shg in (gone, kept):
+            outbox.publish('order.placed', shg_id=shg.id, checkout_id=None, method='UPI', orders=[[1, 'Basket']])
+        gone.user.delete()
+
+        outbox.drain('ledger')
+
+        self.assertEqual(list(LedgerEntry.objects.values_list('shg_id', flat=True)), [kept.id])
+        self.assertEqual(
+            OutboxCheckpoint.objects.get(consumer='ledger').last_event_id,
+            OutboxEvent.objects.latest('id').id,
+        )
+
+    def test_replay_does_not_duplicate_ledger_notes(self):
+        shg = self._shg('replayed')
+        outbox.publish('order.placed', shg_id=shg.id, checkout_id=None, method='UPI', orders=[[1, 'Basket']])
+        outbox.drain('ledger')
+        outbox.reset('ledger')
+        outbox.drain('ledger')
+
+        self.assertEqual(LedgerEntry.objects.filter(shg=shg).count(), 1)
+        self.assertEqual(list(ledger.verify([shg.id])), [(shg.id, 1, 0, [])])
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.shg = SHG.objects.create(
+            user=User.objects.create_user(username='ledger'), name='Ledger SHG', contact_person='Test',
+            phone='0000000000', email='ledger@example.com', state='Test', city='Test',
+        )
+
+    def test_rollups_and_statement_in_paise(self):
+        ledger.record([
+            LedgerEntry(shg=self.shg, date=date(2026, 9, 5), description='Payout', credit_paise=ledger.to_paise('120.50')),
+            LedgerEntry(shg=self.shg, date=date(2026, 10, 1), description='Refund', debit_paise=2025),
+        ])
+
+        month = LedgerMonth.objects.get(shg=self.shg, month=date(2026, 10, 1))
+        self.assertEqual((month.debits_paise, month.closing_balance_paise), (2025, 10025))
+        october = ledger.monthly_statement(self.shg, date_from=date(2026, 10, 1))[0]
+        self.assertEqual((october['opening'], october['closing']), (Decimal('120.50'), Decimal('100.25')))
+        self.assertEqual(list(ledger.verify()), [(self.shg.id, 2, 10025, [])])
+
+    def test_verify_reports_a_tampered_entry(self):
+        ledger.record([LedgerEntry(shg=self.shg, date=date(2026, 10, 1), description='Payout', credit_paise=500)])
+        # Bypass the append-only guards the way a direct SQL edit would
+        LedgerEntry._base_manager.filter(shg=self.shg).update(credit_paise=50000)
+
+        [(_shg_id, _count, _balance, problems)] = ledger.verify()
+        self.assertEqual([message for _sequence, message in problems][-1], 'hash mismatch')
+
+
+class MarketplaceSearchTests(TestCase):
+    def setUp(self):
+        for level, count in (('gold', 25), ('silver', 30)):
+            shg = SHG.objects.create(
+                user=User.objects.create_user(username=level), name=f'{level} SHG', contact_person='Test',
+                phone='0000000000', email=f'{level}@example.com', state='Test', city='Test',
+                verification_level=level,
+            )
+            for i in range(count):
+                Product.objects.create(
+                    shg=shg, title=f'Handmade basket {level} {i}', slug=f'basket-{level}-{i}',
+                    description='Woven by hand.', price=Decimal('100.00'), category='handicrafts',
+                    inventory=1, status='live',
+                )
+        with translation.override('en'):
+            self.url = reverse('market:marketplace')
+
+    def test_facet_filters_apply_before_paging(self):
+        response = self.client.get(self.url, {'q': 'handmade', 'level': 'gold'})
+        self.assertEqual(len(response.context['products']), 24)
+        self.assertTrue(all(product.shg.verification_level == 'gold' for product in response.context['products']))
+        self.assertContains(response, 'level=gold&amp;page=2')
+
+        response = self.client.get(self.url, {'q': 'handmade', 'level': 'gold', 'page': 2})
+        self.assertEqual(len(response.context['products']), 1)
+        self.assertIsNone(response.context['next_page'])
+
+    def test_search_honours_sort(self):
+        Product.objects.filter(slug='basket-silver-3').update(rating_avg=4.5, rating_count=2)
+        response = self.client.get(self.url, {'q': 'handmade', 'sort': 'rating'})
+        self.assertEqual(response.context['products'][0].slug, 'basket-silver-3')
+
+
+class CatalogExportTests(TestCase):
+    def setUp(self):
+        self.shg = SHG.objects.create(
+            user=User.objects.create_user(username='export'), name='Export SHG', contact_person='Test',
+            phone='0000000000', email='export@example.com', state='Test', city='Test',
+        )
+        with translation.override('en'):
+            self.url = reverse('market:catalog_export_api')
+
+    def _product(self, slug, status):
+        return Product.objects.create(
+            shg=self.shg, title=slug, slug=slug, description='Secret draft copy.', price=Decimal('50.00'),
+            category='other', inventory=1, status=status,
+        )
+
+    def _delta(self, since):
+        response = self.client.get(self.url, {'updated_since': since.isoformat()})
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_delta_tombstones_unpublished_and_deleted_products(self):
+        since = timezone.now() - timedelta(seconds=1)
+        pending = self._product('pending-product', 'pending')
+        gone = self._product('gone-product', 'live')
+        gone_id = gone.id
+        gone.delete()
+
+        rows = self._delta(since)
+        self.assertIn({'id': pending.id, 'status': 'pending'}, rows)
+        self.assertIn({'id': gone_id, 'status': 'deleted'}, rows)
+
+
+class LoadtestPercentileTests(TestCase):
+    def test_nearest_rank(self):
+        values = list(range(1, 11))
+        self.assertEqual([percentile(values, p) for p in (0.05, 0.5, 0.95, 0.99, 1.0)], [1, 5, 10, 10, 10])
+        self.assertEqual(percentile(list(range(1, 101)), 0.07), 7)
+        self.assertEqual(percentile(list(range(1, 21)), 0.95), 19)
+
+
+class SettlementTests(TestCase):
+    def test_settled_wallets_match_the_ledger(self):
+        products = []
+        for name in ('north', 'south'):
+            shg = SHG.objects.create(
+                user=User.objects.create_user(username=name), name=name, contact_person='Test',
+                phone='0000000000', email=f'{name}@example.com', state='Test', city='Test',
+            )
+            products.append(Product.objects.create(
+                shg=shg, title=name, slug=name, description='Test.', price=Decimal('0.10'),
+                category='other', inventory=10, status='live',
+            ))
+        # Amounts that drift when added up as floats
+        for product, amount in [(products[0], '0.10'), (products[0], '0.20'), (products[0], '199.99'),
+                                (products[1], '0.70'), (products[1], '0.10')]:
+            Order.objects.create(
+                product=product, buyer_name='Buyer', buyer_contact='9999999999', address='1, Area, City',
+                amount=Decimal(amount), status='delivered',
+            )
+
+        settled, payouts = settlement.settle_batch()
+
+        self.assertEqual(settled, 5)
+        self.assertEqual(payouts, {products[0].shg_id: 20029, products[1].shg_id: 80})
+        self.assertEqual(SHG.objects.get(pk=products[0].shg_id).wallet_balance, Decimal('200.29'))
+        call_command('verify_ledger', check_wallets=True, stdout=StringIO(), stderr=StringIO())
@@ -12,6 +12,9 @@ urlpatterns = [
     path('product/<slug:slug>/', views.product_detail, name='product_detail'),
     path('product/<slug:slug>/order/', views.buyer_order, name='buyer_order'),
     path('product/<slug:slug>/payment/', views.fake_payment, name='fake_payment'),
+    path('product/<slug:slug>/add-to-cart/', views.cart_add, name='cart_add'),
+    path('cart/', views.cart, name='cart'),
+    path('cart/update/', views.cart_update, name='cart_update'),
 
     # Authentication
     path('signup/', views.shg_signup, name='shg_signup'),
@@ -46,13 +49,17 @@ urlpatterns = [
     path('admin/reject-removal/<int:product_id>/', views.reject_removal, name='reject_removal'),
     path('admin/orders/', views.admin_orders, name='admin_orders'),
     path('admin/approve-order/<int:order_id>/', views.approve_order, name='approve_order'),
+    path('admin/orders/bulk/', views.admin_orders_bulk, name='admin_orders_bulk'),
+    path('admin/orders/export/', views.admin_orders_export, name='admin_orders_export'),
     path('admin/forecast/', views.generate_forecast, name='generate_forecast'),
     path('admin/digicourses/', views.admin_digicourses, name='admin_digicourses'),
     path('admin/digicourses/<int:course_id>/delete/', views.admin_delete_digicourse, name='admin_delete_digicourse'),
 
     # APIs
     path('instabrand/', views.instabrand_api, name='instabrand_api'),
+    path('api/catalog/', views.catalog_export_api, name='catalog_export_api'),
     path('api/shg/wallet/', views.shg_wallet_api, name='shg_wallet_api'),
+    path('api/shg/wallet/events/', views.shg_wallet_events, name='shg_wallet_events'),
     path('api/admin/forecast/', views.admin_forecast_api, name='admin_forecast_api'),
     path('api/notifications/', views.notifications_poll, name='notifications_poll'),
     path('api/mark-notification-read/<int:notif_id>/', views.mark_notification_read, name='mark_notification_read'),
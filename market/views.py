@@ -1,25 +1,100 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponse, Http404
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified, QueryDict, StreamingHttpResponse
 from django.contrib import messages
-from django.db.models import Q, Count, Sum
+from django.db import transaction
+from django.db.models import Q, Count, Sum, Max
 from django.utils import timezone
 from django.utils.translation import gettext as _
-from datetime import timedelta
+from datetime import date, datetime, timedelta
+import asyncio
+import base64
 import csv
 from io import StringIO
 from django.utils.text import slugify
-
-from .models import SHG, Product, Order, DigiCourse, DigiProgress, ForecastNotification, LedgerEntry, BuyerProfile, ProductReview
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from urllib.parse import urlencode
+import hashlib
+import json
+import time
+
+from . import caching, facets, inventory, ledger, outbox
+from .middleware import slow_requests
+from .models import SHG, Product, DeletedProduct, Order, DigiCourse, DigiProgress, ForecastNotification, LedgerEntry, BuyerProfile, ProductReview, IdempotencyKey
+from .orders import (
+    PAYMENT_METHODS, DuplicateSubmission, OutOfStock, area_from_address, claim_idempotency_key,
+    clean_idempotency_key, new_idempotency_key, place_checkout, placed_payload, previous_result,
+    transition,
+)
+from .search import search_product_ids
 from .forms import SHGRegistrationForm, ProductSubmissionForm, BuyerOrderForm, LoginForm, AdminProductForm, BuyerRegistrationForm, BuyerLoginForm, UserUpdateForm, BuyerProfileForm, DigiCourseForm, ProductReviewForm
 
 
+MARKETPLACE_PAGE_SIZE = 24
+CATALOG_EXPORT_CHUNK_SIZE = 2000
+PRODUCT_REVIEWS_SHOWN = 20
+
+
 def _user_is_admin(user):
     return user.is_authenticated and user.username == 'Admin'
 
 
+# Marketplace sort orders: sort key -> field the keyset cursor is built on
+MARKETPLACE_SORTS = {
+    'newest': 'created_at',
+    'rating': 'rating_avg',
+}
+
+
+def _encode_cursor(product, field='created_at'):
+    value = getattr(product, field)
+    value = value.isoformat() if isinstance(value, date) else repr(value)
+    raw = f"{value}|{product.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor, field='created_at'):
+    """Return (value, id) from a cursor string, or None if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        value, product_id = raw.rsplit('|', 1)
+        if field == 'created_at':
+            value = datetime.fromisoformat(value)
+        elif field == 'date':
+            value = date.fromisoformat(value)
+        else:
+            value = float(value)
+        return value, int(product_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _keyset_page(products, cursor=None, page_size=MARKETPLACE_PAGE_SIZE, field='created_at'):
+    """Return one page in descending (field, id) order after ``cursor``, and the next cursor."""
+    products = products.order_by(f'-{field}', '-id')
+    position = _decode_cursor(cursor, field) if cursor else None
+    if position:
+        value, product_id = position
+        products = products.filter(
+            Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': product_id})
+        )
+
+    page = list(products[:page_size + 1])
+    next_cursor = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        next_cursor = _encode_cursor(page[-1], field)
+    return page, next_cursor
+
+
 @login_required
 def admin_delete_product(request, product_id):
     """Delete a product from admin panel"""
@@ -38,30 +113,156 @@ def admin_delete_product(request, product_id):
     return render(request, 'market/admin_delete_product.html', {'product': product})
 
 
+def _catalog_page_version(request, *args, **kwargs):
+    return caching.catalog_version()
+
+
+def _product_page_version(request, slug):
+    return caching.product_version(slug)
+
+
+@caching.cache_public_page('home', _catalog_page_version)
 def home(request):
-    featured_products = Product.objects.filter(status='live')[:6]
-    return render(request, 'market/home.html', {'featured_products': featured_products})
+    version = caching.catalog_version()
+    featured_products, _next = caching.get_or_set(
+        'home', version, [], lambda: _keyset_page(
+            Product.objects.filter(status='live').select_related('shg'), page_size=6
+        ),
+    )
+    return render(request, 'market/home.html', {
+        'featured_products': featured_products,
+        'catalog_version': version,
+        'cache_timeout': caching.CATALOG_TIMEOUT,
+    })
 
 
+@caching.cache_public_page('marketplace', _catalog_page_version)
 def marketplace(request):
-    products = Product.objects.filter(status='live').order_by('-created_at')
+    version = caching.catalog_version()
+    products = Product.objects.filter(status='live').select_related('shg')
     category_filter = request.GET.get('category')
     if category_filter:
         products = products.filter(category=category_filter)
+    level_filter = request.GET.get('level')
+    if level_filter:
+        products = products.filter(shg__verification_level=level_filter)
+    state_filter = request.GET.get('state')
+    if state_filter:
+        products = products.filter(shg__state=state_filter)
+    price_filter = request.GET.get('price')
+    price_range = facets.price_bucket_range(price_filter) if price_filter else None
+    if price_range:
+        low, high = price_range
+        products = products.filter(price__gte=low)
+        if high is not None:
+            products = products.filter(price__lt=high)
+
+    query = request.GET.get('q', '').strip()
+    # Searches default to best match; browsing has no rank to sort by
+    default_sort = 'relevance' if query else 'newest'
+    sort = request.GET.get('sort')
+    if sort not in MARKETPLACE_SORTS and not (query and sort == 'relevance'):
+        sort = default_sort
+
+    filters = {
+        'q': query,
+        'sort': sort if sort != default_sort else None,
+        'category': category_filter,
+        'level': level_filter,
+        'state': state_filter,
+        'price': price_filter,
+    }
+    context = {
+        'category_filter': category_filter,
+        'level_filter': level_filter,
+        'state_filter': state_filter,
+        'price_filter': price_filter,
+        'sort': sort,
+        'filter_query': urlencode({k: v for k, v in filters.items() if v}),
+        'facets': _marketplace_facets(version),
+        'catalog_version': version,
+        'cache_timeout': caching.CATALOG_TIMEOUT,
+    }
+
+    if query:
+        search_filters = {
+            'category': category_filter, 'level': level_filter, 'state': state_filter,
+            'price_range': price_range, 'sort': sort,
+        }
+        return _marketplace_search(request, products, query, search_filters, context)
+
+    cursor = request.GET.get('after')
+    products, next_cursor = caching.get_or_set(
+        'marketplace', version, [context['filter_query'], cursor],
+        lambda: _keyset_page(products, cursor, field=MARKETPLACE_SORTS[sort]),
+    )
     
-    return render(request, 'market/marketplace.html', {
+    context.update({
         'products': products,
-        'category_filter': category_filter
+        'next_cursor': next_cursor,
+        'cursor': cursor,
+        'is_first_page': not cursor,
     })
+    return render(request, 'market/marketplace.html', context)
+
+
+def _marketplace_facets(version):
+    """Filter options with their live product counts, read from the FacetCount summary."""
+    counts = caching.get_or_set('facets', version, [], lambda: dict(facets.facet_counts()))
+    return {
+        'categories': [
+            (value, label, counts.get(facets.CATEGORY, {}).get(value, 0))
+            for value, label in Product.CATEGORY_CHOICES
+        ],
+        'levels': [
+            (value, label, counts.get(facets.VERIFICATION, {}).get(value, 0))
+            for value, label in SHG.VERIFICATION_CHOICES
+        ],
+        'states': [
+            (value, value, count)
+            for value, count in sorted(counts.get(facets.STATE, {}).items())
+        ],
+        'prices': [
+            (key, key, counts.get(facets.PRICE, {}).get(key, 0))
+            for key, _low, _high in facets.PRICE_BUCKETS
+        ],
+    }
+
+
+def _marketplace_search(request, products, query, search_filters, context):
+    """Ranked search results are paged by offset, since rank order has no stable key."""
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+
+    ids = search_product_ids(
+        query, **search_filters,
+        limit=MARKETPLACE_PAGE_SIZE + 1, offset=(page - 1) * MARKETPLACE_PAGE_SIZE,
+    )
+    has_next = len(ids) > MARKETPLACE_PAGE_SIZE
+    ids = ids[:MARKETPLACE_PAGE_SIZE]
+    by_id = products.in_bulk(ids)
+    results = [by_id[pk] for pk in ids if pk in by_id]
+
+    context.update({
+        'products': results,
+        'query': query,
+        'page': page,
+        'next_page': page + 1 if has_next else None,
+        'previous_page': page - 1 if page > 1 else None,
+    })
+    return render(request, 'market/marketplace.html', context)
 
 
 def contact_us(request):
     return render(request, 'market/contact.html')
 
 
+@caching.cache_public_page('product', _product_page_version)
 def product_detail(request, slug):
     product = get_object_or_404(Product, slug=slug, status='live')
-    reviews = ProductReview.objects.filter(product=product).select_related('user')
+    reviews = ProductReview.objects.filter(product=product).select_related('user')[:PRODUCT_REVIEWS_SHOWN]
     review_form = None
 
     if request.method == 'POST':
@@ -85,6 +286,8 @@ def product_detail(request, slug):
         'product': product,
         'reviews': reviews,
         'review_form': review_form,
+        'product_version': caching.product_version(slug),
+        'cache_timeout': caching.CATALOG_TIMEOUT,
     })
 
 
@@ -218,54 +421,163 @@ def shg_wallet(request):
     except SHG.DoesNotExist:
         return redirect('admin_dashboard')
     
-    ledger_entries = LedgerEntry.objects.filter(shg=shg).order_by('-date')
-    
-    if request.GET.get('export') == 'csv':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="ledger_{shg.name}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Date', 'Description', 'Credit', 'Debit', 'Balance After'])
-        
-        for entry in ledger_entries:
-            writer.writerow([
-                entry.date, entry.description, 
-                entry.credit, entry.debit, entry.balance_after
-            ])
-        
-        return response
-    
+    if request.GET.get('export') in ('csv', 'statement'):
+        return _ledger_export(shg, request.GET)
+
+    ledger_version = ledger.latest_id(shg.id)
+    page, next_cursor = _keyset_page(LedgerEntry.objects.filter(shg=shg), page_size=WALLET_PAGE_SIZE, field='date')
     return render(request, 'market/shg_wallet.html', {
         'shg': shg,
-        'ledger_entries': ledger_entries
+        'ledger_entries': page,
+        'next_cursor': next_cursor,
+        'ledger_version': ledger_version,
+        'ledger_months': shg.ledger_months.order_by('-month')[:WALLET_SUMMARY_MONTHS],
     })
 
 
+def _ledger_export(shg, params):
+    """Stream the SHG's ledger (``export=csv``) or monthly statement (``export=statement``) as CSV."""
+    date_from = _parse_date_param(params.get('from'))
+    date_to = _parse_date_param(params.get('to'))
+    if params.get('export') == 'statement':
+        header = ['Month', 'Opening Balance', 'Credits', 'Debits', 'Closing Balance', 'Entries']
+        rows = (
+            [month['month'].strftime('%Y-%m'), month['opening'], month['credits'], month['debits'],
+             month['closing'], month['entries']]
+            for month in ledger.monthly_statement(shg, date_from, date_to)
+        )
+        kind = 'statement'
+    else:
+        running_total = params.get('running') == '1'
+        header = ['Date', 'Description', 'Credit', 'Debit', 'Balance After']
+        if running_total:
+            header.append('Running Total')
+        rows = ledger.export_rows(shg, date_from, date_to, running_total=running_total,
+                                  chunk_size=CATALOG_EXPORT_CHUNK_SIZE)
+        kind = 'ledger'
+
+    period = '_'.join(day.isoformat() for day in (date_from, date_to) if day)
+    filename = '_'.join(part for part in (kind, slugify(shg.name), period) if part)
+    response = StreamingHttpResponse(_csv_stream(header, rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+WALLET_PAGE_SIZE = 50
+WALLET_SUMMARY_MONTHS = 12
+WALLET_MAX_PAGE_SIZE = 200
+
+
+def _ledger_entry_json(entry):
+    return {
+        'id': entry.id,
+        'date': entry.date.strftime('%Y-%m-%d'),
+        'description': entry.description,
+        'credit': float(entry.credit) if entry.credit else None,
+        'debit': float(entry.debit) if entry.debit else None,
+        'balance_after': str(entry.balance_after),
+    }
+
+
+def _wallet_delta(shg, since_id, limit=WALLET_PAGE_SIZE):
+    """Balance and up to ``limit`` entries after ``since_id``, oldest first."""
+    new = list(LedgerEntry.objects.filter(shg=shg, id__gt=since_id).order_by('id')[:limit + 1])
+    return {
+        'balance': str(shg.wallet_balance),
+        'has_more': len(new) > limit,
+        'entries': [_ledger_entry_json(entry) for entry in new[:limit]],
+        'version': new[:limit][-1].id if new[:limit] else since_id,
+    }
+
+
 @login_required
 def shg_wallet_api(request):
+    """The SHG's balance and ledger entries, by ``since_id`` poll or ``cursor`` page."""
     try:
         shg = request.user.shg
     except SHG.DoesNotExist:
         return JsonResponse({'error': 'forbidden'}, status=403)
-    
-    ledger_entries = LedgerEntry.objects.filter(shg=shg).order_by('-date', '-id')
-    data = {
-        'balance': str(shg.wallet_balance),
-        'entries': []
-    }
-
-    for entry in ledger_entries:
-        data['entries'].append({
-            'date': entry.date.strftime('%Y-%m-%d'),
-            'description': entry.description,
-            'credit': float(entry.credit) if entry.credit else None,
-            'debit': float(entry.debit) if entry.debit else None,
-            'balance_after': str(entry.balance_after),
-        })
 
+    try:
+        limit = max(0, min(int(request.GET.get('limit', WALLET_PAGE_SIZE)), WALLET_MAX_PAGE_SIZE))
+    except ValueError:
+        limit = WALLET_PAGE_SIZE
+    entries = LedgerEntry.objects.filter(shg=shg)
+    data = {'balance': str(shg.wallet_balance)}
+
+    since_id = request.GET.get('since_id', '')
+    if since_id.isdigit():
+        if ledger.version(shg.id) == int(since_id):
+            return HttpResponseNotModified()
+        return JsonResponse(_wallet_delta(shg, int(since_id), limit))
+
+    # Read the version first so an entry added meanwhile is picked up by the next delta
+    data['version'] = ledger.latest_id(shg.id)
+    page, next_cursor = (
+        _keyset_page(entries, request.GET.get('cursor'), page_size=limit, field='date') if limit else ([], None)
+    )
+    data['entries'] = [_ledger_entry_json(entry) for entry in page]
+    data['next_cursor'] = next_cursor
     return JsonResponse(data)
 
 
+WALLET_EVENTS_POLL_SECONDS = 1
+WALLET_EVENTS_KEEPALIVE_SECONDS = 15
+WALLET_EVENTS_MAX_SECONDS = 5 * 60
+
+
+@login_required
+async def shg_wallet_events(request):
+    """Server-Sent Events stream of the SHG's wallet; 204 under WSGI."""
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    user = await request.auser()
+    shg = await SHG.objects.filter(user=user).afirst()
+    if shg is None:
+        return JsonResponse({'error': 'forbidden'}, status=403)
+
+    since_id = request.headers.get('Last-Event-ID') or request.GET.get('since_id', '')
+    response = StreamingHttpResponse(
+        _wallet_event_stream(shg.id, int(since_id) if since_id.isdigit() else None),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _wallet_event(shg_id, since_id):
+    shg = SHG.objects.get(pk=shg_id)
+    if since_id is None:
+        data = {'balance': str(shg.wallet_balance), 'has_more': False, 'entries': [],
+                'version': ledger.latest_id(shg_id)}
+    else:
+        data = _wallet_delta(shg, since_id)
+    return data, f"event: ledger\nid: {data['version']}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _wallet_event_stream(shg_id, since_id):
+    deadline = time.monotonic() + WALLET_EVENTS_MAX_SECONDS
+    last_sent = time.monotonic()
+    yield 'retry: 3000\n\n'
+    if since_id is None:
+        data, event = await sync_to_async(_wallet_event)(shg_id, None)
+        since_id = data['version']
+        yield event
+    while time.monotonic() < deadline:
+        if await sync_to_async(ledger.version)(shg_id) != since_id:
+            data, event = await sync_to_async(_wallet_event)(shg_id, since_id)
+            since_id = data['version']
+            last_sent = time.monotonic()
+            yield event
+            if data['has_more']:
+                continue
+        elif time.monotonic() - last_sent >= WALLET_EVENTS_KEEPALIVE_SECONDS:
+            last_sent = time.monotonic()
+            yield ': keepalive\n\n'
+        await asyncio.sleep(WALLET_EVENTS_POLL_SECONDS)
+
+
 @login_required
 def admin_dashboard(request):
     if not _user_is_admin(request.user):
@@ -292,6 +604,7 @@ def admin_dashboard(request):
         'pending_orders': pending_orders,
         'live_products': live_products,
         'recent_reviews': recent_reviews,
+        'slow_requests': slow_requests()[:20],
     }
     
     return render(request, 'market/admin_dashboard.html', context)
@@ -332,7 +645,11 @@ def admin_edit_product(request, product_id):
             product = form.save(commit=False)
             # Keep slug in sync with title and SHG
             product.slug = slugify(f"{product.title}-{product.shg.name}")
-            product.save()
+            with transaction.atomic():
+                product.save()
+                # save() leaves stock alone; apply the edit as a change from the loaded value
+                if 'inventory' in form.changed_data:
+                    inventory.adjust(product.id, form.cleaned_data['inventory'] - form.initial['inventory'])
             messages.success(request, 'Product updated successfully!')
             return redirect('market:admin_dashboard')
     else:
@@ -378,13 +695,21 @@ def approve_product(request, product_id):
         pass
     
     product = get_object_or_404(Product, id=product_id)
-    product.status = 'live'
-    product.save()
+    _set_product_status(product, 'live')
     
     messages.success(request, f'Product "{product.title}" approved!')
     return redirect('market:admin_pending_products')
 
 
+def _set_product_status(product, status):
+    """Save the review decision and its ``product.status_changed`` event together."""
+    with transaction.atomic():
+        product.status = status
+        product.save(update_fields=['status', 'updated_at'])
+        outbox.publish('product.status_changed', product_id=product.id, shg_id=product.shg_id,
+                       title=product.title, status=status)
+
+
 @login_required
 def approve_removal(request, product_id):
     """Admin approves SHG product removal request."""
@@ -418,8 +743,7 @@ def reject_product(request, product_id):
         pass
     
     product = get_object_or_404(Product, id=product_id)
-    product.status = 'rejected'
-    product.save()
+    _set_product_status(product, 'rejected')
     
     messages.success(request, f'Product "{product.title}" rejected!')
     return redirect('market:admin_pending_products')
@@ -457,8 +781,100 @@ def admin_orders(request):
     except SHG.DoesNotExist:
         pass
     
-    orders = Order.objects.all().order_by('-created_at')
-    return render(request, 'market/admin_orders.html', {'orders': orders})
+    orders, filters, filter_query = _admin_order_filters(request.GET)
+    page, next_cursor = _keyset_page(
+        orders.select_related('product__shg'), request.GET.get('after'), ADMIN_ORDERS_PAGE_SIZE,
+    )
+    return render(request, 'market/admin_orders.html', {
+        'orders': page,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('after'),
+        'filters': filters,
+        'filter_query': filter_query,
+        'status_choices': Order.STATUS_CHOICES,
+        'shg_choices': SHG.objects.order_by('name').values_list('id', 'name'),
+    })
+
+
+ADMIN_ORDERS_PAGE_SIZE = 50
+ADMIN_ORDER_EXPORT_FIELDS = (
+    'id', 'created_at', 'status', 'product__title', 'product__shg__name', 'quantity', 'amount',
+    'buyer_name', 'buyer_contact', 'area', 'address',
+)
+
+
+def _parse_date_param(value):
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def _admin_order_filters(params):
+    """Apply the admin order filters; returns (queryset, cleaned filters, query string)."""
+    orders = Order.objects.all()
+    filters = {}
+
+    status = params.get('status', '')
+    if status in dict(Order.STATUS_CHOICES):
+        orders = orders.filter(status=status)
+        filters['status'] = status
+
+    tz = timezone.get_current_timezone()
+    date_from = _parse_date_param(params.get('from'))
+    if date_from:
+        orders = orders.filter(created_at__gte=datetime.combine(date_from, datetime.min.time(), tz))
+        filters['from'] = date_from.isoformat()
+    date_to = _parse_date_param(params.get('to'))
+    if date_to:
+        orders = orders.filter(created_at__lt=datetime.combine(date_to + timedelta(days=1), datetime.min.time(), tz))
+        filters['to'] = date_to.isoformat()
+
+    shg = params.get('shg', '')
+    if shg.isdigit():
+        orders = orders.filter(product_id__in=Product.objects.filter(shg_id=int(shg)).values('id'))
+        filters['shg'] = int(shg)
+
+    area = params.get('area', '').strip()
+    if area:
+        orders = orders.filter(area=area)
+        filters['area'] = area
+
+    return orders, filters, urlencode(filters)
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_stream(header, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+@login_required
+def admin_orders_export(request):
+    """Stream the filtered order list as CSV."""
+    if not _user_is_admin(request.user):
+        messages.error(request, 'You do not have permission to access the admin panel.')
+        return redirect('market:login')
+
+    orders, _filters, _filter_query = _admin_order_filters(request.GET)
+    rows = (
+        orders.order_by('-created_at', '-id')
+        .values_list(*ADMIN_ORDER_EXPORT_FIELDS)
+        .iterator(chunk_size=CATALOG_EXPORT_CHUNK_SIZE)
+    )
+    header = ['Order ID', 'Created', 'Status', 'Product', 'SHG', 'Quantity', 'Amount',
+              'Buyer', 'Contact', 'Area', 'Address']
+    response = StreamingHttpResponse(_csv_stream(header, rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="orders_{timezone.now():%Y%m%d}.csv"'
+    return response
 
 
 @login_required
@@ -516,13 +932,61 @@ def approve_order(request, order_id):
         pass
     
     order = get_object_or_404(Order, id=order_id)
-    order.status = 'approved'
-    order.save()
-    
-    messages.success(request, f'Order {order.id} approved!')
+    if transition([order.id], 'approved'):
+        messages.success(request, f'Order {order.id} approved!')
+    else:
+        messages.error(request, f'Order {order.id} cannot be approved from {order.get_status_display()}.')
     return redirect('market:admin_orders')
 
 
+@login_required
+def admin_orders_bulk(request):
+    """Apply one status change to all selected orders; invalid transitions are skipped."""
+    if not _user_is_admin(request.user):
+        messages.error(request, 'You do not have permission to access the admin panel.')
+        return redirect('market:login')
+
+    status = request.POST.get('status')
+    order_ids = [int(pk) for pk in request.POST.getlist('order_ids') if pk.isdigit()]
+    if request.method != 'POST' or status not in dict(Order.STATUS_CHOICES):
+        return redirect('market:admin_orders')
+    if not order_ids:
+        messages.error(request, 'Select at least one order.')
+        return _admin_orders_redirect(request)
+
+    changed = transition(order_ids, status)
+    label = dict(Order.STATUS_CHOICES)[status]
+    if changed:
+        messages.success(request, f'{len(changed)} orders marked {label}.')
+    skipped = len(set(order_ids)) - len(changed)
+    if skipped:
+        messages.warning(request, f'{skipped} orders skipped: they cannot move to {label} from their current status.')
+    return _admin_orders_redirect(request)
+
+
+def _admin_orders_redirect(request):
+    # Back to the console with the filters the bulk action was made from
+    _orders, _filters, filter_query = _admin_order_filters(QueryDict(request.POST.get('filters', '')))
+    url = reverse('market:admin_orders')
+    return redirect(f'{url}?{filter_query}' if filter_query else url)
+
+
+def _buyer_initial(user):
+    """Pre-fill the order form with the buyer's name and saved contact details."""
+    initial = {
+        'buyer_name': f"{user.first_name} {user.last_name}".strip() or user.username,
+    }
+    try:
+        buyer_profile = user.buyerprofile
+        initial.update({
+            'buyer_contact': buyer_profile.phone,
+            'address': buyer_profile.address
+        })
+    except BuyerProfile.DoesNotExist:
+        pass
+    return initial
+
+
 @login_required
 def buyer_order(request, slug):
     product = get_object_or_404(Product, slug=slug, status='live')
@@ -535,35 +999,26 @@ def buyer_order(request, slug):
     if request.method == 'POST':
         form = BuyerOrderForm(request.POST)
         if form.is_valid():
-            # Double-check inventory before proceeding to payment
-            if product.inventory <= 0:
+            # Hold one unit until payment; resubmitting the form replaces the old hold
+            previous = request.session.get('pending_order') or {}
+            if previous.get('reservation_id'):
+                inventory.release(previous['reservation_id'], user=request.user)
+            reservation = inventory.reserve(product, request.user)
+            if reservation is None:
                 messages.error(request, 'Sorry, this product is now out of stock.')
                 return redirect('market:product_detail', slug=slug)
 
             # Store pending order details in session and redirect to fake payment page
             request.session['pending_order'] = {
                 'product_id': product.id,
+                'reservation_id': reservation.id,
                 'buyer_name': form.cleaned_data.get('buyer_name'),
                 'buyer_contact': form.cleaned_data.get('buyer_contact'),
                 'address': form.cleaned_data.get('address'),
             }
             return redirect('market:fake_payment', slug=slug)
     else:
-        # Pre-fill form with buyer's information if available
-        initial = {
-            'buyer_name': f"{request.user.first_name} {request.user.last_name}".strip() or request.user.username,
-        }
-        
-        try:
-            buyer_profile = request.user.buyerprofile
-            initial.update({
-                'buyer_contact': buyer_profile.phone,
-                'address': buyer_profile.address
-            })
-        except BuyerProfile.DoesNotExist:
-            pass
-            
-        form = BuyerOrderForm(initial=initial)
+        form = BuyerOrderForm(initial=_buyer_initial(request.user))
     
     return render(request, 'market/buyer_order.html', {
         'product': product,
@@ -575,6 +1030,10 @@ def buyer_order(request, slug):
 def fake_payment(request, slug):
     product = get_object_or_404(Product, slug=slug, status='live')
 
+    idempotency_key = clean_idempotency_key(request.POST.get('idempotency_key'))
+    if request.method == 'POST' and previous_result(idempotency_key, request.user):
+        return _payment_replayed(request)
+
     pending = request.session.get('pending_order')
     if not pending or pending.get('product_id') != product.id:
         messages.error(request, 'Your payment session has expired. Please place the order again.')
@@ -582,41 +1041,41 @@ def fake_payment(request, slug):
 
     if request.method == 'POST':
         payment_method = request.POST.get('payment_method') or 'card'
-        method_label = {
-            'card': 'Card',
-            'upi': 'UPI',
-            'cod': 'Cash on Delivery',
-        }.get(payment_method, 'Card')
-
-        # Final inventory check before creating order
-        if product.inventory <= 0:
+        method_label = PAYMENT_METHODS.get(payment_method, PAYMENT_METHODS['card'])
+
+        with transaction.atomic():
+            # A concurrent double-tap loses the claim and gets the first result
+            if idempotency_key and claim_idempotency_key(idempotency_key, request.user) is not None:
+                return _payment_replayed(request)
+
+            order = Order.objects.create(
+                product=product,
+                buyer=request.user,
+                amount=product.price,
+                buyer_name=pending.get('buyer_name') or (f"{request.user.first_name} {request.user.last_name}".strip() or request.user.username),
+                buyer_contact=pending.get('buyer_contact') or '',
+                address=pending.get('address') or '',
+                area=area_from_address(pending.get('address')),
+                status='pending_admin_approval',
+            )
+
+            # Use the stock held at order-form time; if that hold was already
+            # released, take a fresh unit or give up
+            if not inventory.commit(pending.get('reservation_id'), request.user, order) \
+                    and not inventory.take(product.id):
+                transaction.set_rollback(True)
+                order = None
+            else:
+                # The SHG's pending ledger note is written by the outbox consumer
+                outbox.publish('order.placed', **placed_payload(product.shg_id, [order], method_label))
+                if idempotency_key:
+                    IdempotencyKey.objects.filter(key=idempotency_key).update(order=order)
+
+        if order is None:
             messages.error(request, 'Sorry, this product is now out of stock.')
             request.session.pop('pending_order', None)
             return redirect('market:product_detail', slug=slug)
 
-        order = Order.objects.create(
-            product=product,
-            amount=product.price,
-            buyer_name=pending.get('buyer_name') or (f"{request.user.first_name} {request.user.last_name}".strip() or request.user.username),
-            buyer_contact=pending.get('buyer_contact') or '',
-            address=pending.get('address') or '',
-            status='pending_admin_approval',
-        )
-
-        # Update inventory
-        product.inventory -= 1
-        product.save()
-
-        # Add ledger entry for SHG (will be credited after approval)
-        LedgerEntry.objects.create(
-            shg=product.shg,
-            date=timezone.now().date(),
-            description=f"Order #{order.id} - {product.title} ({method_label}, Pending)",
-            credit=0,
-            debit=0,
-            balance_after=product.shg.wallet_balance
-        )
-
         request.session.pop('pending_order', None)
         messages.success(request, 'Payment successful! Your order has been placed and is pending approval.')
         return redirect('market:my_orders')
@@ -624,6 +1083,105 @@ def fake_payment(request, slug):
     return render(request, 'market/fake_payment.html', {
         'product': product,
         'pending': pending,
+        'idempotency_key': new_idempotency_key(),
+    })
+
+
+def _payment_replayed(request):
+    """Response for a payment form that was already submitted: the original outcome."""
+    messages.info(request, 'This payment was already submitted. Your order has been placed.')
+    return redirect('market:my_orders')
+
+
+CART_MAX_QUANTITY = 10
+
+
+def _parse_quantity(value, default=1):
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(0, min(quantity, CART_MAX_QUANTITY))
+
+
+def _cart_lines(request):
+    """Cart contents as ``[(product, quantity), ...]``; unavailable products are dropped."""
+    cart = request.session.get('cart', {})
+    products = Product.objects.filter(pk__in=cart, status='live').select_related('shg').in_bulk()
+    return [
+        (products[int(product_id)], quantity)
+        for product_id, quantity in cart.items()
+        if int(product_id) in products
+    ]
+
+
+@login_required
+def cart_add(request, slug):
+    product = get_object_or_404(Product, slug=slug, status='live')
+    if request.method == 'POST':
+        cart = request.session.get('cart', {})
+        key = str(product.id)
+        quantity = _parse_quantity(request.POST.get('quantity'))
+        cart[key] = min(cart.get(key, 0) + quantity, CART_MAX_QUANTITY)
+        if not cart[key]:
+            del cart[key]
+        request.session['cart'] = cart
+        messages.success(request, _('%(title)s added to your cart.') % {'title': product.title})
+    return redirect('market:cart')
+
+
+@login_required
+def cart_update(request):
+    if request.method == 'POST':
+        cart = {}
+        for product_id, quantity in request.session.get('cart', {}).items():
+            quantity = _parse_quantity(request.POST.get(f'quantity-{product_id}'), default=quantity)
+            if quantity:
+                cart[product_id] = quantity
+        request.session['cart'] = cart
+    return redirect('market:cart')
+
+
+@login_required
+def cart(request):
+    idempotency_key = clean_idempotency_key(request.POST.get('idempotency_key'))
+    if request.method == 'POST' and previous_result(idempotency_key, request.user):
+        return _payment_replayed(request)
+
+    lines = _cart_lines(request)
+    form = BuyerOrderForm(initial=_buyer_initial(request.user))
+
+    if request.method == 'POST' and lines:
+        form = BuyerOrderForm(request.POST)
+        if form.is_valid():
+            try:
+                place_checkout(
+                    request.user, lines,
+                    buyer_name=form.cleaned_data['buyer_name'],
+                    buyer_contact=form.cleaned_data['buyer_contact'],
+                    address=form.cleaned_data['address'],
+                    payment_method=request.POST.get('payment_method') or 'card',
+                    idempotency_key=idempotency_key,
+                )
+            except DuplicateSubmission:
+                return _payment_replayed(request)
+            except OutOfStock as exc:
+                messages.error(request, _('Not enough stock left for: %(products)s. Please adjust your cart.')
+                               % {'products': exc})
+            else:
+                request.session.pop('cart', None)
+                messages.success(request, _('Payment successful! Your orders have been placed and are pending approval.'))
+                return redirect('market:my_orders')
+
+    return render(request, 'market/cart.html', {
+        'lines': [
+            {'product': product, 'quantity': quantity, 'total': product.price * quantity}
+            for product, quantity in lines
+        ],
+        'cart_total': sum(product.price * quantity for product, quantity in lines),
+        'quantity_choices': range(0, CART_MAX_QUANTITY + 1),
+        'form': form,
+        'idempotency_key': new_idempotency_key(),
     })
 
 
@@ -645,6 +1203,90 @@ def instabrand_api(request):
     return render(request, 'market/instabrand.html')
 
 
+CATALOG_EXPORT_FIELDS = (
+    'id', 'slug', 'title', 'description', 'category', 'price', 'inventory', 'image', 'status',
+    'rating_avg', 'rating_count', 'created_at', 'updated_at',
+    'shg_id', 'shg__name', 'shg__city', 'shg__state', 'shg__verification_level',
+)
+
+
+def catalog_export_api(request):
+    """Stream the catalog, or an ``updated_since`` delta with tombstones, as NDJSON."""
+    products = Product.objects.all()
+    deleted = DeletedProduct.objects.none()
+    updated_since = request.GET.get('updated_since')
+    if updated_since:
+        since = parse_datetime(updated_since)
+        if since is None:
+            return JsonResponse({'error': 'updated_since must be an ISO 8601 datetime'}, status=400)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        products = products.filter(updated_at__gt=since)
+        deleted = DeletedProduct.objects.filter(deleted_at__gt=since)
+    else:
+        products = products.filter(status='live')
+
+    summary = products.aggregate(last_modified=Max('updated_at'), count=Count('id'))
+    deletions = deleted.aggregate(last_modified=Max('deleted_at'), count=Count('id'))
+    last_modified = max(filter(None, (summary['last_modified'], deletions['last_modified'])), default=None)
+    etag_source = (
+        f"{updated_since or ''}|{last_modified.isoformat() if last_modified else ''}|"
+        f"{summary['count']}|{deletions['count']}"
+    )
+    etag = '"%s"' % hashlib.sha256(etag_source.encode()).hexdigest()[:32]
+    last_modified_ts = int(last_modified.timestamp()) if last_modified else None
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+    if not_modified is not None:
+        return not_modified
+
+    rows = (
+        products.order_by('id')
+        .values(*CATALOG_EXPORT_FIELDS)
+        .iterator(chunk_size=CATALOG_EXPORT_CHUNK_SIZE)
+    )
+    deleted_ids = deleted.order_by('product_id').values_list('product_id', flat=True).iterator(
+        chunk_size=CATALOG_EXPORT_CHUNK_SIZE,
+    )
+    response = StreamingHttpResponse(_catalog_ndjson(request, rows, deleted_ids), content_type='application/x-ndjson')
+    response['ETag'] = etag
+    if last_modified_ts is not None:
+        response['Last-Modified'] = http_date(last_modified_ts)
+    return response
+
+
+def _catalog_ndjson(request, rows, deleted_ids=()):
+    for row in rows:
+        if row['status'] != 'live':
+            # Unpublished products are not public; say only that they are gone
+            yield json.dumps({'id': row['id'], 'status': row['status']}) + '\n'
+            continue
+        yield json.dumps({
+            'id': row['id'],
+            'slug': row['slug'],
+            'title': row['title'],
+            'description': row['description'],
+            'category': row['category'],
+            'price': str(row['price']),
+            'inventory': row['inventory'],
+            'image': request.build_absolute_uri(default_storage.url(row['image'])) if row['image'] else None,
+            'status': row['status'],
+            'rating_avg': round(row['rating_avg'], 2),
+            'rating_count': row['rating_count'],
+            'created_at': row['created_at'].isoformat(),
+            'updated_at': row['updated_at'].isoformat(),
+            'shg': {
+                'id': row['shg_id'],
+                'name': row['shg__name'],
+                'city': row['shg__city'],
+                'state': row['shg__state'],
+                'verification_level': row['shg__verification_level'],
+            },
+        }, ensure_ascii=False) + '\n'
+    for product_id in deleted_ids:
+        yield json.dumps({'id': product_id, 'status': 'deleted'}) + '\n'
+
+
 def notifications_poll(request):
     try:
         shg = request.user.shg
@@ -714,6 +1356,7 @@ def generate_forecast(request):
 
 def _build_forecasts(create_notifications=False, filter_product=None):
     forecasts = []
+    alerts = []
 
     products = Product.objects.filter(status='live').select_related('shg')
     if filter_product is not None:
@@ -736,12 +1379,7 @@ def _build_forecasts(create_notifications=False, filter_product=None):
                 'priority': 'high',
             })
 
-            if create_notifications:
-                notif = ForecastNotification.objects.create(
-                    title='Low Inventory Alert',
-                    message=message,
-                )
-                notif.target_shgs.add(product.shg)
+            alerts.append({'title': 'Low Inventory Alert', 'message': message, 'shg_id': product.shg_id})
 
     # Rule 2: seasonal boost for food products
     for product in products.filter(category='food'):
@@ -758,12 +1396,11 @@ def _build_forecasts(create_notifications=False, filter_product=None):
             'priority': 'medium',
         })
 
-        if create_notifications:
-            notif = ForecastNotification.objects.create(
-                title='Seasonal Demand Insight',
-                message=message,
-            )
-            notif.target_shgs.add(product.shg)
+        alerts.append({'title': 'Seasonal Demand Insight', 'message': message, 'shg_id': product.shg_id})
+
+    if create_notifications:
+        # Delivered to the SHGs by the outbox notifications consumer
+        outbox.publish_many('forecast.alert', alerts)
 
     return forecasts
 
@@ -984,10 +1621,7 @@ def buyer_logout(request):
 
 @login_required
 def my_orders(request):
-    # Get orders where the buyer's name matches the logged-in user's name
-    orders = Order.objects.filter(
-        buyer_name__iexact=f"{request.user.first_name} {request.user.last_name}".strip() or request.user.username
-    ).order_by('-created_at')
+    orders = Order.objects.filter(buyer=request.user).select_related('product').order_by('-created_at')
     
     return render(request, 'market/buyer/orders.html', {
         'orders': orders
@@ -996,11 +1630,7 @@ def my_orders(request):
 
 @login_required
 def order_detail(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
-    # Verify the order belongs to the current user
-    if not (order.buyer_name == f"{request.user.first_name} {request.user.last_name}".strip() or 
-            order.buyer_name == request.user.username):
-        raise Http404("Order not found")
+    order = get_object_or_404(Order, id=order_id, buyer=request.user)
     
     return render(request, 'market/buyer/order_detail.html', {
         'order': order
@@ -1009,38 +1639,19 @@ def order_detail(request, order_id):
 
 @login_required
 def cancel_order(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
-
-    # Verify the order belongs to the current user (same logic as order_detail)
-    expected_name = f"{request.user.first_name} {request.user.last_name}".strip() or request.user.username
-    if order.buyer_name.lower() != expected_name.lower():
-        raise Http404("Order not found")
+    order = get_object_or_404(Order, id=order_id, buyer=request.user)
 
+    # Buyers may only cancel before approval; admins can also cancel approved orders
     if order.status != 'pending_admin_approval':
         messages.error(request, 'This order can no longer be cancelled.')
         return redirect('market:my_orders')
 
     if request.method == 'POST':
-        # Mark as cancelled
-        order.status = 'cancelled'
-        order.save()
-
-        # Restore product inventory
-        product = order.product
-        product.inventory += 1
-        product.save()
-
-        # Optional ledger note for transparency
-        LedgerEntry.objects.create(
-            shg=product.shg,
-            date=timezone.now().date(),
-            description=f"Order #{order.id} - {product.title} (Cancelled by buyer)",
-            credit=0,
-            debit=0,
-            balance_after=product.shg.wallet_balance
-        )
-
-        messages.success(request, 'Your order has been cancelled.')
+        # Restocks the product and leaves a ledger note for the SHG
+        if transition([order.id], 'cancelled', reason='buyer'):
+            messages.success(request, 'Your order has been cancelled.')
+        else:
+            messages.error(request, 'This order can no longer be cancelled.')
         return redirect('market:my_orders')
 
     # For safety, only allow POST; GET just redirects
@@ -6,6 +6,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'grambazaar.settings')
 django.setup()
 
 from django.contrib.auth.models import User
+from market import ledger
 from market.models import SHG, Product, DigiCourse, Order, LedgerEntry
 
 
@@ -36,7 +37,7 @@ def run():
             city=cities[i],
             description='Demo Self Help Group for Grambazaar hackathon.',
             verification_level=levels[i],
-            wallet_balance=Decimal('1000.00') * (i + 1),
+            wallet_balance_paise=100000 * (i + 1),
         )
         shgs.append(shg)
 
@@ -91,14 +92,12 @@ def run():
     )
 
     shg = first_product.shg
-    LedgerEntry.objects.create(
+    ledger.record([LedgerEntry(
         shg=shg,
         date=order.created_at.date(),
         description=f'Order {order.id} payout',
-        credit=order.amount,
-        debit=Decimal('0.00'),
-        balance_after=shg.wallet_balance + order.amount,
-    )
+        credit_paise=ledger.to_paise(order.amount),
+    )])
 
     print('Demo data created successfully.')
 